@@ -1,64 +1,305 @@
 import streamlit as st
 import pandas as pd
-from transformers import pipeline
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-from googleapiclient.discovery import build
+import io
+import os
 import re
+import shutil
+import tempfile
+import threading
 import time
+import uuid
+from collections import Counter
+from sentiment import get_cache, warmup
+from crawl_state import CrawlState, IncrementalFetch
+from quota import QuotaExceeded, QuotaScheduler, estimate_units
+import metrics
+from jobs import JobManager
+from pipeline import (
+    CSV_CHUNK_ROWS,
+    add_sentiment,
+    iter_classified_csv,
+    iter_classified_pages,
+    prepare_comments,
+    word_frequencies,
+)
+from rendering import render_job
+from youtube import build_client, iter_comment_records
 
 # 🌟 Load YouTube API key securely from secrets
 api_key = st.secrets["api"]["youtube_api_key"]
 
 
-# 🌟 Initialize YouTube API client
-def youtube_scraper(video_id, api_key, max_comments=20):
-    youtube = build("youtube", "v3", developerKey=api_key)
-    comments = []
-    request = youtube.commentThreads().list(
-        part="snippet",
-        videoId=video_id,
-        maxResults=min(max_comments, 100),
-        textFormat="plainText",
-    )
-    response = request.execute()
-    for item in response["items"]:
-        comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-        comments.append(comment)
-    return comments
+# 🌟 Warm the model up on a background thread once per server process, so the
+# page (and the health check) is served while the weights load. Heavy
+# libraries (torch, transformers, matplotlib, wordcloud, googleapiclient,
+# pyarrow) are imported where they are first used, not here.
+@st.cache_resource
+def start_warmup():
+    thread = threading.Thread(target=warmup, daemon=True)
+    thread.start()
+    return thread
+
+
+if os.environ.get("SENTIMENT_WARMUP", "1") != "0":
+    start_warmup()
 
 
-# 🌟 Cache model loading to prevent reloading each time
+# 🌟 Prometheus endpoint for the stage timings of this server process
+# (http://127.0.0.1:$METRICS_PORT/metrics); off unless METRICS_PORT is set
 @st.cache_resource
-def load_model():
-    classifier = pipeline(
-        "sentiment-analysis", model="cardiffnlp/twitter-roberta-base-sentiment"
-    )
-    return classifier
+def start_metrics_server(port):
+    return metrics.start_http_server(port)
+
+
+if os.environ.get("METRICS_PORT"):
+    start_metrics_server(int(os.environ["METRICS_PORT"]))
+
+
+# 🌟 Per-video watermarks and stored results for incremental re-fetches
+@st.cache_resource
+def get_crawl_state():
+    return CrawlState()
+
+
+# 🌟 Daily API quota shared with every other process using the key; the app's
+# requests are interactive, so they may dip into the crawls' reserve
+@st.cache_resource
+def get_quota():
+    return QuotaScheduler()
+
+
+# 🌟 Columnar (Parquet) store that every fetch and upload is saved to
+@st.cache_resource
+def get_store():
+    from store import CommentStore
+
+    return CommentStore()
+
+
+# 🌟 Pie chart and word cloud as PNG images, drawn once by the job from
+# running totals (sentiment -> count and word -> frequency), so neither the
+# comments nor the charts are rebuilt when a finished job is redrawn.
+# matplotlib's object API (not pyplot) is safe to use off the script thread.
+def chart_images(sentiment_counts, word_counts):
+    from matplotlib.figure import Figure
+    from wordcloud import WordCloud
+
+    images = {}
+    if sentiment_counts:
+        sentiment_counts = pd.Series(sentiment_counts).sort_values(ascending=False)
+        with metrics.timer("render.pie"):
+            fig = Figure()
+            ax = fig.subplots()
+            ax.pie(
+                sentiment_counts,
+                labels=sentiment_counts.index,
+                autopct="%1.1f%%",
+                startangle=90,
+            )
+            ax.axis("equal")
+            png = io.BytesIO()
+            fig.savefig(png, format="png")
+            images["pie"] = png.getvalue()
+
+    if word_counts:
+        with metrics.timer("render.wordcloud"):
+            wordcloud = WordCloud(
+                width=800, height=400, background_color="white"
+            ).generate_from_frequencies(word_counts)
+            png = io.BytesIO()
+            wordcloud.to_image().save(png, format="PNG")
+            images["wordcloud"] = png.getvalue()
+    return images
+
+
+def render_charts(images):
+    if "pie" in images:
+        st.write("### Sentiment Distribution")
+        st.image(images["pie"])
+    if "wordcloud" in images:
+        st.write("### Word Cloud of Comments")
+        st.image(images["wordcloud"])
+
+
+# 🌟 Background jobs, shared by every session of this server process. An
+# analysis keeps running (and its results stay available) when a widget
+# change reruns the script; the session only remembers the job id.
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
 
 
-classifier = load_model()
+# 🌟 The comment store keeps a copy of every analysis; failing to save one
+# must not throw away results the user already waited (and paid quota) for
+def store_warning(error):
+    if error is None:
+        return None
+    return f"Results were not saved to the comment store: {error}"
 
-# 🌟 Label mapping for human-readable output
-label_map = {"LABEL_0": "negative", "LABEL_1": "neutral", "LABEL_2": "positive"}
 
+# 🌟 Tab 1 job: fetch, classify and store a video's comments. Pages stream
+# through classification as they arrive; only running totals and the first
+# rows for display are kept, so memory stays flat however big the video is
+def live_analysis(job, video_id, pages, crawl_state, store):
+    from store import CommentStoreWriter
 
-# 🌟 Function to predict sentiment
-def predict_sentiment(comment):
-    result = classifier(str(comment))
-    label_raw = result[0]["label"]
-    label = label_map.get(label_raw, "unknown")
-    score = result[0]["score"]
-    return label, score
+    sentiment_counts = Counter()
+    word_counts = Counter()
+    warnings = []
+    store_writer = CommentStoreWriter(
+        store, video_id, source="live", ignore_errors=True
+    )
+    results = iter_classified_pages(pages)
+    try:
+        for page, page_df in results:
+            page_words = word_frequencies(" ".join(page_df["comment"]))
+            if crawl_state is not None:
+                crawl_state.add_results(
+                    video_id, page, page_df["sentiment"], page_df["score"], page_words
+                )
+            store_writer.append(page_df)
+            job.append(page_df[["comment", "sentiment", "score"]])
+            sentiment_counts.update(page_df["sentiment"])
+            word_counts.update(page_words)
+            job.report(f"Analyzed {sum(sentiment_counts.values())} comments so far...")
+            job.check_cancelled()
+    except QuotaExceeded as e:
+        # Whatever was analyzed before the quota ran out is kept
+        warnings.append(str(e))
+    finally:
+        results.close()
+        store_writer.flush()
+    if store_writer.error is not None:
+        warnings.append(store_warning(store_writer.error))
+    job.report(f"Analyzed {sum(sentiment_counts.values())} comments.")
+
+    # Charts cover everything analyzed for the video, old and new, from the
+    # totals kept in the crawl state rather than by re-reading every comment
+    caption = None
+    if crawl_state is not None:
+        pages.commit()
+        new_comments = sum(sentiment_counts.values())
+        sentiment_counts = Counter(crawl_state.sentiment_counts(video_id))
+        word_counts = crawl_state.word_counts(video_id)
+        if not word_counts and sentiment_counts:
+            # State from before word counts were kept: rebuild them once
+            crawl_state.rebuild_word_counts(video_id, word_frequencies)
+            word_counts = crawl_state.word_counts(video_id)
+        caption = (
+            f"{new_comments} new comments, "
+            f"{sum(sentiment_counts.values())} analyzed in total for this video"
+        )
+    return {
+        "charts": chart_images(sentiment_counts, word_counts),
+        "caption": caption,
+        "warnings": warnings,
+    }
+
+
+# 🌟 Tab 2 job: classify an uploaded CSV held in memory. The results go to
+# output_path for download rather than staying in memory with the job
+def csv_analysis(job, df, output_path, store, store_video_id):
+    def update_progress(done, total):
+        job.report(f"Processing unique comment {done}/{total}...", done / total)
+        job.check_cancelled()
+
+    unique_comments = add_sentiment(df, update_progress)
+    store_error = None
+    try:
+        store.write(df, video_id=store_video_id, source="csv")
+    except Exception as exc:
+        store_error = exc
+    job.append(df)
+    job.report("Sentiment analysis completed!")
+
+    df.to_csv(output_path, index=False)
+    text_combined = " ".join(df["clean_comment"].dropna().astype(str))
+    return {
+        "charts": chart_images(
+            Counter(df["sentiment"]), word_frequencies(text_combined)
+        ),
+        "caption": (
+            f"{unique_comments} unique comments out of {len(df)} rows "
+            f"({1 - unique_comments / max(len(df), 1):.0%} duplicates skipped)"
+        ),
+        "warning": store_warning(store_error),
+        "output_path": output_path,
+    }
+
+
+# 🌟 Tab 2 job, streaming mode: only one chunk is in memory at a time. Each is
+# cleaned, classified and appended to the output file, and only the counts
+# behind the charts are kept
+def csv_streaming_analysis(job, input_path, output_path, store, store_video_id):
+    from store import CommentStoreWriter
+
+    sentiment_counts, word_counts = Counter(), Counter()
+    total_rows = 0
+    input_size = os.path.getsize(input_path)
+    try:
+        with open(input_path, "rb") as input_file, CommentStoreWriter(
+            store, store_video_id, source="csv", ignore_errors=True
+        ) as store_writer:
+            for i, chunk in enumerate(iter_classified_csv(input_file)):
+                chunk.to_csv(output_path, mode="a", header=i == 0, index=False)
+                store_writer.append(chunk)
+
+                job.append(chunk)
+                total_rows += len(chunk)
+                sentiment_counts.update(chunk["sentiment"])
+                word_counts.update(
+                    word_frequencies(
+                        " ".join(chunk["clean_comment"].dropna().astype(str))
+                    )
+                )
+                job.report(
+                    f"Processed {total_rows} rows...",
+                    input_file.tell() / max(input_size, 1),
+                )
+                job.check_cancelled()
+    finally:
+        os.remove(input_path)
+
+    job.report(f"Sentiment analysis completed for {total_rows} rows!")
+    return {
+        "charts": chart_images(sentiment_counts, word_counts),
+        "caption": f"Results written to {output_path}",
+        "warning": store_warning(store_writer.error),
+        "output_path": output_path,
+    }
+
+
+def render_live_result(result):
+    for warning in result["warnings"]:
+        st.warning(warning)
+    if result["caption"]:
+        st.caption(result["caption"])
+    render_charts(result["charts"])
+
+
+def render_csv_result(result):
+    if result["warning"]:
+        st.warning(result["warning"])
+    st.caption(result["caption"])
+    render_charts(result["charts"])
+
+    # Read only when the button is clicked, not on every rerun
+    def data():
+        with open(result["output_path"], "rb") as output_file:
+            return output_file.read()
+
+    st.download_button(
+        "Download Results CSV",
+        data=data,
+        file_name="youtube_comments_with_sentiment.csv",
+        mime="text/csv",
+    )
 
 
-# 🌟 Clean text function for CSV uploads
-def clean_text(text):
-    text = str(text)
-    text = re.sub(r"http\S+", "", text)
-    text = re.sub(r"[^A-Za-z0-9\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+# The session's job of the given kind, if the job manager still has it
+def session_job(key):
+    job_id = st.session_state.get(key)
+    return None if job_id is None else get_job_manager().get(job_id)
 
 
 # 🌟 Streamlit App UI
@@ -70,6 +311,21 @@ tab1, tab2 = st.tabs(["🔴 Live Scraping Analysis", "📁 File Upload Analysis"
 with tab1:
     st.header("🔴 Live YouTube Comment Scraper + Sentiment Analysis")
     video_url = st.text_input("Enter YouTube Video URL:")
+    max_comments = st.number_input(
+        "Max comments to fetch", min_value=1, max_value=100_000, value=100, step=100
+    )
+    incremental = st.checkbox(
+        "Only fetch comments posted since this video was last analyzed"
+    )
+    include_replies = st.checkbox(
+        "Include replies (max comments counts top-level comments only)",
+        disabled=incremental,
+    )
+    st.caption(
+        f"Costs about {estimate_units(int(max_comments))} of the "
+        f"{get_quota().usage()['remaining']} API units left today"
+        + (" (plus one per page of replies)" if include_replies else "")
+    )
 
     if video_url:
         if "watch?v=" in video_url:
@@ -81,114 +337,131 @@ with tab1:
             video_id = None
 
         if video_id and st.button("Fetch Comments"):
-            comments = youtube_scraper(video_id, api_key)
-            st.write("### Sample Comments:")
-            for c in comments:
-                st.write("-", c)
-
-            st.write("### Sentiment Analysis Results:")
-            sentiments, scores = [], []
-            for c in comments:
-                label, score = predict_sentiment(c)
-                sentiments.append(label)
-                scores.append(score)
-                st.write(f"{c[:50]}... ➡ **{label}** ({score:.2f})")
-
-            st.write("### Sentiment Distribution")
-            sentiment_counts = pd.Series(sentiments).value_counts()
-            fig, ax = plt.subplots()
-            ax.pie(
-                sentiment_counts,
-                labels=sentiment_counts.index,
-                autopct="%1.1f%%",
-                startangle=90,
+            youtube = build_client(api_key)
+            quota = get_quota()
+            crawl_state = None
+            if incremental:
+                crawl_state = get_crawl_state()
+                pages = IncrementalFetch(
+                    youtube, video_id, crawl_state, int(max_comments), quota=quota
+                )
+            else:
+                pages = iter_comment_records(
+                    youtube,
+                    video_id,
+                    int(max_comments),
+                    replies=include_replies,
+                    quota=quota,
+                )
+            job = get_job_manager().submit(
+                "live",
+                live_analysis,
+                video_id,
+                pages,
+                crawl_state,
+                get_store(),
             )
-            ax.axis("equal")
-            st.pyplot(fig)
+            st.session_state["live_job"] = job.id
 
-            st.write("### Word Cloud of Comments")
-            text_combined = " ".join(comments)
-            wordcloud = WordCloud(
-                width=800, height=400, background_color="white"
-            ).generate(text_combined)
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wordcloud, interpolation="bilinear")
-            plt.axis("off")
-            st.pyplot(plt)
+    live_job = session_job("live_job")
+    if live_job is not None:
+        st.write("### Sentiment Analysis Results:")
+        render_job(live_job, render_live_result)
 
 # ========== 📁 Tab 2: File Upload ==========
 with tab2:
     st.header("📁 Bulk Sentiment Analysis via CSV Upload")
     uploaded_file = st.file_uploader("Upload YouTube Comments CSV", type="csv")
 
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        df.columns = df.columns.str.lower()
+    streaming_mode = st.checkbox(
+        "Streaming mode for very large files (reads and analyzes the CSV in "
+        f"chunks of {CSV_CHUNK_ROWS:,} rows)"
+    )
 
-        if "clean_comment" not in df.columns:
-            if "comment" in df.columns:
-                df["clean_comment"] = df["comment"].apply(clean_text)
+    if uploaded_file is not None:
+        upload_name = re.sub(r"[^A-Za-z0-9_.-]", "_", uploaded_file.name)
+        store_video_id = f"upload-{upload_name}"
+        try:
+            if streaming_mode:
+                df = prepare_comments(pd.read_csv(uploaded_file, nrows=5))
+                uploaded_file.seek(0)
             else:
-                st.error("No 'comment' column found in uploaded CSV.")
-                st.stop()
+                df = prepare_comments(pd.read_csv(uploaded_file))
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
 
         st.write("### Sample Comments Loaded")
         st.write(df.head())
 
-        run_analysis = st.button("Run Sentiment Analysis")
-        if run_analysis:
-            sentiments, scores = [], []
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            comments_list = df["clean_comment"].tolist()
-            total_comments = len(comments_list)
-
-            for i, comment in enumerate(comments_list):
-                status_text.text(f"Processing comment {i+1}/{total_comments}...")
-                if pd.isnull(comment) or str(comment).strip() == "":
-                    sentiments.append("neutral")
-                    scores.append(0.0)
-                else:
-                    label, score = predict_sentiment(comment)
-                    sentiments.append(label)
-                    scores.append(score)
-                progress_bar.progress((i + 1) / total_comments)
-
-            df["sentiment"] = sentiments
-            df["score"] = scores
-
-            status_text.text("Sentiment analysis completed!")
-            progress_bar.empty()
-
-            st.write("### Comments with Sentiment")
-            st.write(df.head(10))
-
-            st.write("### Sentiment Distribution")
-            sentiment_counts = df["sentiment"].value_counts()
-            fig2, ax2 = plt.subplots()
-            ax2.pie(
-                sentiment_counts,
-                labels=sentiment_counts.index,
-                autopct="%1.1f%%",
-                startangle=90,
-            )
-            ax2.axis("equal")
-            st.pyplot(fig2)
-
-            st.write("### Word Cloud of Comments")
-            text_combined = " ".join(df["clean_comment"].dropna().tolist())
-            wordcloud = WordCloud(
-                width=800, height=400, background_color="white"
-            ).generate(text_combined)
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wordcloud, interpolation="bilinear")
-            plt.axis("off")
-            st.pyplot(plt)
-
-            st.download_button(
-                "Download Results CSV",
-                data=df.to_csv(index=False),
-                file_name="youtube_comments_with_sentiment.csv",
-                mime="text/csv",
+        if st.button("Run Sentiment Analysis"):
+            output_path = os.path.join(
+                tempfile.gettempdir(),
+                f"sentiment-{uuid.uuid4().hex}-{upload_name}",
             )
+            if streaming_mode:
+                # The job reads its own copy of the upload, so reruns of this
+                # script can keep using uploaded_file
+                with tempfile.NamedTemporaryFile(
+                    prefix="upload-", suffix=".csv", delete=False
+                ) as input_file:
+                    shutil.copyfileobj(uploaded_file, input_file)
+                uploaded_file.seek(0)
+                job = get_job_manager().submit(
+                    "csv",
+                    csv_streaming_analysis,
+                    input_file.name,
+                    output_path,
+                    get_store(),
+                    store_video_id,
+                )
+                # Also covers a job cancelled before it started
+                job.keep_file(input_file.name)
+            else:
+                job = get_job_manager().submit(
+                    "csv", csv_analysis, df, output_path, get_store(), store_video_id
+                )
+            job.keep_file(output_path)
+            st.session_state["csv_job"] = job.id
+
+    csv_job = session_job("csv_job")
+    if csv_job is not None:
+        st.write("### Comments with Sentiment")
+        render_job(csv_job, render_csv_result)
+
+# ========== 🗄️ Sidebar: result cache ==========
+cache = get_cache()
+if cache is not None:
+    cache_stats = cache.stats()
+    st.sidebar.write("### 🗄️ Sentiment Cache")
+    st.sidebar.write(
+        f"This process: {cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+    st.sidebar.write(
+        f"All time: {cache_stats['total_hits']} hits / "
+        f"{cache_stats['total_misses']} misses"
+    )
+    st.sidebar.write(f"Cached comments: {cache_stats['entries']}")
+
+# ========== ⏱️ Sidebar: stage timings ==========
+# Every analysis and page render of this server process so far; each job's
+# own breakdown is shown under its results
+with st.sidebar.expander("⏱️ Stage Timings"):
+    breakdown = metrics.REGISTRY.breakdown()
+    if breakdown:
+        st.dataframe(
+            pd.DataFrame(breakdown)[["stage", "calls", "total_s", "mean_ms"]],
+            hide_index=True,
+        )
+    st.download_button(
+        "Download (Prometheus)",
+        data=metrics.REGISTRY.to_prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain",
+    )
+    st.download_button(
+        "Download (JSON)",
+        data=metrics.REGISTRY.to_json(),
+        file_name="metrics.json",
+        mime="application/json",
+    )
@@ -0,0 +1,80 @@
+"""Compare fixed-size batching with length-bucketed batching.
+
+Run from the repo root:  python benchmarks/bench_batching.py [--n 2000]
+Reports real (non-padding) tokens/sec and the share of padded tokens.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from sentiment import (  # noqa: E402
+    fixed_size_batches,
+    length_bucketed_batches,
+    load_model,
+    predict_sentiment_batch,
+)
+
+
+# 🌟 Synthetic YouTube-like comments: mostly short, with a long tail
+def make_comments(n, seed=0):
+    rng = random.Random(seed)
+    words = " ".join(pd.read_csv("sample_comments.csv")["comment"]).split()
+    comments = []
+    for _ in range(n):
+        length = min(int(rng.paretovariate(1.2) * 3), 300)
+        comments.append(" ".join(rng.choice(words) for _ in range(length)))
+    return comments
+
+
+def padded_tokens(lengths, batches):
+    return sum(max(lengths[i] for i in b) * len(b) for b in batches)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    args = parser.parse_args()
+
+    comments = make_comments(args.n)
+    tokenizer = load_model().tokenizer
+    lengths = [len(ids) for ids in tokenizer(comments, truncation=True)["input_ids"]]
+    real_tokens = sum(lengths)
+
+    modes = {
+        f"fixed (batch_size={args.batch_size})": (
+            {"batch_size": args.batch_size},
+            fixed_size_batches(lengths, args.batch_size),
+        ),
+        f"bucketed (token_budget={args.token_budget})": (
+            {"token_budget": args.token_budget},
+            length_bucketed_batches(lengths, args.token_budget),
+        ),
+    }
+
+    # Bypass the result cache and any inference server: every run must reach
+    # the model, or later runs would only time cache lookups
+    uncached = {"use_cache": False, "server_url": None}
+    predict_sentiment_batch(comments[:64], **uncached)  # warm-up
+    print(f"{args.n} comments, {real_tokens} real tokens")
+    for name, (kwargs, batches) in modes.items():
+        start = time.perf_counter()
+        predict_sentiment_batch(comments, **kwargs, **uncached)
+        elapsed = time.perf_counter() - start
+        padding = 1 - real_tokens / padded_tokens(lengths, batches)
+        print(
+            f"{name:32s} {real_tokens / elapsed:10.0f} tokens/s  "
+            f"{len(batches):5d} batches  {padding:6.1%} padding  {elapsed:7.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
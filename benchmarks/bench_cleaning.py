@@ -0,0 +1,62 @@
+"""Compare per-row clean_text with the whole-column clean_text_series.
+
+Run from the repo root:  python benchmarks/bench_cleaning.py [--rows 1000000]
+Fails if the two cleaners disagree on any row.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from cleaning import clean_text, clean_text_series  # noqa: E402
+
+PIECES = [
+    "great video",
+    "worst editing ever!!!",
+    "😂😂😂",
+    "❤️",
+    "check https://example.com/watch?v=abc123 out",
+    "I learned so much, thank you.",
+    "  lots   of\tspaces \n",
+    "¿Qué tal?",
+    "@someone 10/10",
+]
+
+
+def make_comments(rows, seed=0):
+    rng = random.Random(seed)
+    return pd.Series(
+        [" ".join(rng.choices(PIECES, k=rng.randint(1, 6))) for _ in range(rows)]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    comments = make_comments(args.rows)
+
+    start = time.perf_counter()
+    expected = comments.apply(clean_text)
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned = clean_text_series(comments)
+    vectorized_time = time.perf_counter() - start
+
+    assert cleaned.tolist() == expected.tolist(), "outputs differ"
+    print(f"{args.rows} comments, outputs identical")
+    print(f"Series.apply(clean_text) {apply_time:7.2f}s")
+    print(f"clean_text_series        {vectorized_time:7.2f}s")
+    print(f"speedup                  {apply_time / vectorized_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
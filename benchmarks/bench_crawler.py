@@ -0,0 +1,70 @@
+"""Compare the sequential googleapiclient scraper with the asyncio crawler.
+
+Run from the repo root:  python benchmarks/bench_crawler.py [--videos 20]
+Both run against benchmarks/mock_youtube_api.py started in-process, with
+--latency seconds added to every request to mimic the real API.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_youtube_api import serve  # noqa: E402
+from crawler import crawl_videos  # noqa: E402
+from youtube import build_client, iter_comment_pages  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.comments, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{args.port}"
+    video_ids = [f"video{i:06d}" for i in range(args.videos)]
+
+    start = time.perf_counter()
+    youtube = build_client("benchmark-key", api_endpoint=endpoint)
+    sequential = {
+        v: [c for page in iter_comment_pages(youtube, v) for c in page]
+        for v in video_ids
+    }
+    sequential_time = time.perf_counter() - start
+
+    # Errors are only injected for the async run; the sequential scraper has
+    # no retry logic
+    server.RequestHandlerClass.error_rate = args.error_rate
+    start = time.perf_counter()
+    crawled = crawl_videos(
+        video_ids,
+        "benchmark-key",
+        api_endpoint=endpoint,
+        concurrency_per_host=args.concurrency,
+        quota_rate=1000.0,
+        quota_burst=1000,
+        backoff_base=0.05,
+    )
+    crawl_time = time.perf_counter() - start
+    server.shutdown()
+
+    total = sum(len(c) for c in crawled.values())
+    assert crawled == sequential, "crawler returned different comments"
+    print(f"{args.videos} videos, {total} comments, {args.latency}s latency")
+    print(
+        f"sequential scraper {sequential_time:7.2f}s {total / sequential_time:9.0f}/s"
+    )
+    print(f"async crawler      {crawl_time:7.2f}s {total / crawl_time:9.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
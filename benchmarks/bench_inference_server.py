@@ -0,0 +1,95 @@
+"""Many small concurrent requests: one shared model with and without
+cross-request micro-batching.
+
+Run from the repo root:  python benchmarks/bench_inference_server.py
+Simulates --clients app sessions, each classifying --requests pages of
+--page-size comments. "direct" calls predict_sentiment_batch from every
+client thread on the shared in-process model; "server" sends the same pages
+to inference_server.py (started in-process) with its micro-batching.
+"""
+
+import argparse
+import functools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_batching import make_comments  # noqa: E402
+from inference_server import MicroBatcher, predict_remote, serve  # noqa: E402
+from sentiment import predict_sentiment_batch, warmup  # noqa: E402
+
+
+def run_clients(clients, pages, classify):
+    def client(i):
+        return [classify(page) for page in pages[i::clients]]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        results = list(executor.map(client, range(clients)))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=8)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8501)
+    args = parser.parse_args()
+
+    total = args.clients * args.requests
+    comments = make_comments(total * args.page_size)
+    pages = [
+        comments[i : i + args.page_size]
+        for i in range(0, len(comments), args.page_size)
+    ]
+    warmup(server_url=None)
+
+    direct_time, direct = run_clients(
+        args.clients,
+        pages,
+        functools.partial(predict_sentiment_batch, use_cache=False, server_url=None),
+    )
+
+    batcher = MicroBatcher(
+        functools.partial(
+            predict_sentiment_batch,
+            token_budget=8192,
+            use_cache=False,
+            server_url=None,
+        ),
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+    )
+    server = serve(port=args.port, batcher=batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{args.port}"
+    server_time, served = run_clients(
+        args.clients, pages, lambda page: predict_remote(page, url)
+    )
+    server.shutdown()
+
+    mismatched = sum(
+        a != b
+        for client_direct, client_served in zip(direct, served)
+        for (labels_a, _), (labels_b, _) in zip(client_direct, client_served)
+        for a, b in zip(labels_a, labels_b)
+    )
+    n = len(comments)
+    print(f"{args.clients} clients x {args.requests} requests x {args.page_size}")
+    print(f"direct  {direct_time:7.2f}s {n / direct_time:8.0f} comments/s")
+    print(
+        f"server  {server_time:7.2f}s {n / server_time:8.0f} comments/s "
+        f"(mean batch {batcher.stats()['mean_batch_size']:.1f})"
+    )
+    print(f"label mismatches: {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Bytes on the wire and fetch time with and without partial responses.
+
+Run from the repo root:  python benchmarks/bench_partial_response.py
+Fetches pages from benchmarks/mock_youtube_api.py (started in-process) with
+the full response and with youtube.COMMENT_FIELDS, each with and without
+gzip, then times a whole video through iter_comment_pages both ways.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_youtube_api import serve  # noqa: E402
+from youtube import (  # noqa: E402
+    COMMENT_FIELDS,
+    build_client,
+    iter_comment_pages,
+    parse_comment_records,
+)
+
+
+def page_bytes(endpoint, fields, encoding):
+    params = {"part": "snippet", "videoId": "video", "maxResults": 100}
+    if fields:
+        params["fields"] = fields
+    response = httpx.get(
+        f"{endpoint}/youtube/v3/commentThreads",
+        params=params,
+        headers={"Accept-Encoding": encoding},
+    )
+    return response.num_bytes_downloaded, len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, default=20_000)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.comments)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{args.port}"
+
+    print("bytes per 100-comment page   wire   decoded")
+    for label, fields in [("full", None), ("fields", COMMENT_FIELDS)]:
+        for encoding in ["identity", "gzip"]:
+            wire, decoded = page_bytes(endpoint, fields, encoding)
+            print(f"{label:6} {encoding:8}             {wire:7d}  {decoded:7d}")
+
+    youtube = build_client("benchmark-key", api_endpoint=endpoint)
+    results = {}
+    for label, fields in [("full", None), ("fields", COMMENT_FIELDS)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            records = [
+                r
+                for page in iter_comment_pages(
+                    youtube, "video", parse=parse_comment_records, fields=fields
+                )
+                for r in page
+            ]
+            best = min(best, time.perf_counter() - start)
+        results[label] = records
+        print(f"{label:6} {len(records)} comments in {best:.3f}s")
+    server.shutdown()
+    assert results["full"] == results["fields"], "partial response lost data"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Import-time report for the modules app.py loads on a cold start.
+
+Run from the repo root:  python benchmarks/bench_startup.py [--top 15]
+Uses `python -X importtime` in a fresh interpreter for two sets of imports:
+what app.py imports at module level, and the heavy libraries it now defers
+to the code paths that use them (model loading, charts, API calls, store).
+"""
+
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+APP_IMPORTS = [
+    "streamlit",
+    "pandas",
+    "numpy",
+    "sentiment",
+    "cleaning",
+    "crawl_state",
+    "streaming",
+    "youtube",
+]
+DEFERRED_IMPORTS = [
+    "torch",
+    "transformers",
+    "matplotlib.pyplot",
+    "wordcloud",
+    "googleapiclient.discovery",
+    "pyarrow.dataset",
+]
+
+
+def import_times(modules):
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # One separator space, then two more per nesting level
+        times.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return times
+
+
+def report(title, modules, top):
+    available = [m for m in modules if importlib.util.find_spec(m.split(".")[0])]
+    missing = sorted(set(modules) - set(available))
+    times = import_times(available)
+    # Top-level entries (no leading spaces) add up to the total import time
+    total = sum(cum for name, _, cum in times if not name.startswith(" "))
+    print(f"== {title}: {total / 1e6:.2f}s")
+    for name, _, cumulative in sorted(times, key=lambda t: -t[2])[:top]:
+        print(f"  {cumulative / 1e3:9.1f} ms  {name.strip()}")
+    if missing:
+        print(f"  (not installed, skipped: {', '.join(missing)})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    report("app.py module-level imports", APP_IMPORTS, args.top)
+    report("deferred until first use", DEFERRED_IMPORTS, args.top)
+
+
+if __name__ == "__main__":
+    main()
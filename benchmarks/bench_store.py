@@ -0,0 +1,89 @@
+"""Compare the Parquet comment store with the CSV exports it replaces.
+
+Run from the repo root:  python benchmarks/bench_store.py [--rows 1000000]
+Reports on-disk size, full load time, and a single-video dashboard query.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks.mock_youtube_api import WORDS  # noqa: E402
+from store import CommentStore  # noqa: E402
+
+
+def make_frame(rows, videos, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    lengths = rng.integers(1, 20, rows)
+    comments = [" ".join(rng.choice(words, n)) for n in lengths]
+    return pd.DataFrame(
+        {
+            "comment_id": [f"c{i}" for i in range(rows)],
+            "comment": comments,
+            "clean_comment": comments,
+            "like_count": rng.integers(0, 1000, rows),
+            "sentiment": rng.choice(["negative", "neutral", "positive"], rows),
+            "score": rng.random(rows),
+            "video_id": rng.choice([f"video{i:04d}" for i in range(videos)], rows),
+        }
+    )
+
+
+def dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--videos", type=int, default=50)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.videos)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "comments.csv")
+        df.to_csv(csv_path, index=False)
+        store = CommentStore(os.path.join(tmp, "store"))
+        store.write(df, source="benchmark")
+
+        _, csv_load = timed(lambda: pd.read_csv(csv_path))
+        _, store_load = timed(store.read)
+        _, csv_query = timed(
+            lambda: pd.read_csv(csv_path).query("video_id == 'video0001'")
+        )
+        _, store_query = timed(
+            lambda: store.read(video_id="video0001", columns=["sentiment", "score"])
+        )
+
+        print(f"{args.rows} rows, {args.videos} videos")
+        print(f"{'':14s} {'size MiB':>10s} {'load s':>8s} {'1-video s':>10s}")
+        print(
+            f"{'csv':14s} {os.path.getsize(csv_path) / 2**20:10.1f} "
+            f"{csv_load:8.2f} {csv_query:10.3f}"
+        )
+        print(
+            f"{'parquet store':14s} {dir_size(store.root) / 2**20:10.1f} "
+            f"{store_load:8.2f} {store_query:10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
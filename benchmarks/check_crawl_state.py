@@ -0,0 +1,285 @@
+"""Check the resumable crawl, incremental fetch and quota bookkeeping.
+
+Run from the repo root:  python benchmarks/check_crawl_state.py
+Everything runs against benchmarks/mock_youtube_api.py started in-process:
+- bulk_crawl.crawl_to_csv, interrupted every --pages pages (with a
+  half-written page left behind), must resume to a CSV byte-identical to an
+  uninterrupted crawl, with and without replies
+  and must start over if its CSV was deleted or cut short since
+- crawl_state.IncrementalFetch must fetch exactly the comments newer than the
+  watermark, including one posted in the same second as it; a capped run
+  must not move the watermark past a gap, and capped runs in a row must
+  each fetch the next new comments until they reach it
+- quota.QuotaScheduler must keep background charges out of the interactive
+  reserve and share its accounting between instances
+Exits non-zero if any check fails.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import mock_youtube_api  # noqa: E402
+
+failures = []
+
+
+def check(name, ok, detail=""):
+    print(f"{'ok  ' if ok else 'FAIL'} {name}" + (f": {detail}" if detail else ""))
+    if not ok:
+        failures.append(name)
+
+
+class Interrupt(Exception):
+    pass
+
+
+def check_bulk_resume(workdir, pages, replies):
+    from bulk_crawl import checkpoint_path, crawl_to_csv
+
+    label = "with replies" if replies else "top-level only"
+    expected = os.path.join(workdir, f"full-{replies}.csv")
+    crawl_to_csv("resume", expected, "check-key", replies=replies)
+
+    out = os.path.join(workdir, f"resumed-{replies}.csv")
+    written = []
+
+    # log is called once per page, after its checkpoint is saved
+    def stop_after_pages(message):
+        written.append(message)
+        if len(written) % pages == 0:
+            raise Interrupt()
+
+    runs = 0
+    while True:
+        runs += 1
+        try:
+            checkpoint = crawl_to_csv(
+                "resume", out, "check-key", replies=replies, log=stop_after_pages
+            )
+            break
+        except Interrupt:
+            # A crash mid-page leaves rows past the checkpointed offset
+            with open(out, "a", encoding="utf-8") as f:
+                f.write("resume,half-written,row")
+
+    with open(expected, "rb") as f, open(out, "rb") as g:
+        identical = f.read() == g.read()
+    check(
+        f"bulk crawl resumed {runs - 1} times ({label})",
+        identical and checkpoint["done"] and runs > 2,
+        f"{checkpoint['rows']} rows",
+    )
+    os.remove(checkpoint_path(out))
+    check(
+        f"finished crawl is not re-fetched ({label})",
+        crawl_to_csv("resume", expected, "check-key", replies=replies)["done"],
+    )
+
+
+# A checkpoint whose CSV was deleted, or replaced by a shorter file, must
+# start the crawl over rather than pad the CSV with NUL bytes
+def check_stale_checkpoint(workdir, pages):
+    from bulk_crawl import checkpoint_path, crawl_to_csv
+
+    with open(os.path.join(workdir, "full-False.csv"), "rb") as f:
+        expected = f.read()
+    out = os.path.join(workdir, "stale.csv")
+    for label, replace in (("deleted", None), ("cut short", b"comment_id\n")):
+        written = []
+
+        def stop_after_pages(message):
+            written.append(message)
+            if len(written) == pages:
+                raise Interrupt()
+
+        try:
+            crawl_to_csv("resume", out, "check-key", log=stop_after_pages)
+        except Interrupt:
+            pass
+        os.remove(out)
+        if replace is not None:
+            with open(out, "wb") as f:
+                f.write(replace)
+        checkpoint = crawl_to_csv("resume", out, "check-key")
+        with open(out, "rb") as f:
+            content = f.read()
+        check(
+            f"crawl starts over when its CSV was {label}",
+            content == expected and checkpoint["done"],
+            f"{content.count(bytes(1))} NUL bytes, {checkpoint['rows']} rows",
+        )
+        os.remove(out)
+        os.remove(checkpoint_path(out))
+
+
+# Serve `new` extra comments (indices -new..-1) ahead of the original ones,
+# newest first, as if they had been posted since the first fetch. With
+# same_second=True the newest has the publishedAt of the one after it.
+def post_new_comments(make_thread, new, same_second=False):
+    def shifted(video_id, index, max_replies=0):
+        thread = make_thread(video_id, index - new, max_replies)
+        if same_second and index == 0:
+            newest = make_thread(video_id, 1 - new)["snippet"]["topLevelComment"]
+            snippet = thread["snippet"]["topLevelComment"]["snippet"]
+            snippet["publishedAt"] = newest["snippet"]["publishedAt"]
+        return thread
+
+    mock_youtube_api.make_thread = shifted
+
+
+def check_incremental(youtube):
+    from crawl_state import CrawlState, IncrementalFetch
+
+    state = CrawlState(":memory:")
+    make_thread = mock_youtube_api.make_thread
+
+    # One fetch, storing each page the way the app does
+    def run(max_comments=None):
+        fetch = IncrementalFetch(youtube, "incremental", state, max_comments)
+        ids = []
+        for page in fetch:
+            state.add_results(
+                "incremental", page, ["neutral"] * len(page), [0.0] * len(page)
+            )
+            ids += [record["comment_id"] for record in page]
+        fetch.commit()
+        return ids, fetch.complete
+
+    try:
+        ids, _ = run(120)
+        watermark = state.watermark("incremental")[0]
+        check("first run fetches the newest comments", len(ids) == 120)
+        ids, _ = run()
+        check("re-run without new comments fetches nothing", ids == [])
+
+        post_new_comments(make_thread, 30)
+        ids, _ = run()
+        check(
+            "re-run fetches exactly the new comments",
+            ids == [f"incremental-{i}" for i in range(-30, 0)],
+            f"{len(ids)} fetched",
+        )
+        check(
+            "watermark advances to the newest comment",
+            state.watermark("incremental")[0] > watermark,
+        )
+
+        # One more comment, posted in the same second as the newest stored one
+        post_new_comments(make_thread, 31, same_second=True)
+        ids, _ = run()
+        check(
+            "comment in the watermark's second is fetched once",
+            ids == ["incremental--31"],
+            str(ids),
+        )
+
+        # A capped run that stops short of the watermark must not advance it
+        post_new_comments(make_thread, 81)
+        watermark = state.watermark("incremental")
+        ids, complete = run(20)
+        check(
+            "capped run leaves the watermark alone",
+            len(ids) == 20
+            and not complete
+            and state.watermark("incremental")[0] == watermark[0],
+        )
+        ids, complete = run()
+        check(
+            "next run fills the gap",
+            len(ids) == 30 and complete and len(state.results("incremental")) == 201,
+            f"{len(ids)} fetched, {len(state.results('incremental'))} stored",
+        )
+
+        # More new comments than the cap: consecutive capped runs must each
+        # fetch the next ones, not stop at those stored by the run before
+        post_new_comments(make_thread, 331)
+        watermark = state.watermark("incremental")
+        runs = [run(100) for _ in range(3)]
+        fetched = [len(ids) for ids, _ in runs]
+        check(
+            "capped runs in a row keep making progress",
+            fetched == [100, 100, 50]
+            and [complete for _, complete in runs] == [False, False, True]
+            and len(state.results("incremental")) == 451,
+            f"{fetched} fetched, {len(state.results('incremental'))} stored",
+        )
+        check(
+            "watermark advances once the capped runs reach it",
+            state.watermark("incremental")[0] > watermark[0],
+        )
+    finally:
+        mock_youtube_api.make_thread = make_thread
+
+
+def check_quota(workdir):
+    from quota import BACKGROUND, INTERACTIVE, QuotaExceeded, QuotaScheduler
+
+    path = os.path.join(workdir, "quota.sqlite3")
+    options = {"path": path, "daily_limit": 10, "interactive_reserve": 3}
+    background = QuotaScheduler(priority=BACKGROUND, **options)
+    interactive = QuotaScheduler(priority=INTERACTIVE, **options)
+
+    charged = 0
+    while background.try_charge("commentThreads.list"):
+        charged += 1
+    check("background stops at the reserve", charged == 7, f"{charged} units")
+    charged = 0
+    while interactive.try_charge("commentThreads.list"):
+        charged += 1
+    check("interactive may spend the reserve", charged == 3, f"{charged} units")
+    try:
+        interactive.charge("commentThreads.list")
+        raised = False
+    except QuotaExceeded:
+        raised = True
+    check("interactive charge past the limit raises QuotaExceeded", raised)
+    usage = QuotaScheduler(**options).usage()
+    check(
+        "usage is shared between instances",
+        usage["total"] == 10 and usage["remaining"] == 0,
+        str(usage),
+    )
+
+    fresh = QuotaScheduler(
+        priority=INTERACTIVE, **{**options, "path": path + ".exhausted"}
+    )
+    fresh.exhausted()
+    check(
+        "an API quotaExceeded marks the day as spent",
+        not fresh.try_charge("commentThreads.list"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=3, help="pages between kills")
+    args = parser.parse_args()
+
+    server = mock_youtube_api.serve(args.port, args.comments, replies=7)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{args.port}"
+    # bulk_crawl builds its client from YOUTUBE_API_ENDPOINT, read on import
+    os.environ["YOUTUBE_API_ENDPOINT"] = endpoint
+    from youtube import build_client
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for replies in (False, True):
+            check_bulk_resume(workdir, args.pages, replies)
+        check_stale_checkpoint(workdir, args.pages)
+        check_incremental(build_client("check-key", api_endpoint=endpoint))
+        check_quota(workdir)
+
+    if failures:
+        sys.exit(f"{len(failures)} check(s) failed")
+    print("All checks passed")
+
+
+if __name__ == "__main__":
+    main()
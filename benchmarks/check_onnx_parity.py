@@ -0,0 +1,50 @@
+"""Check that the ONNX Runtime backend matches the PyTorch backend.
+
+Run from the repo root:  python benchmarks/check_onnx_parity.py [--csv FILE]
+Exits non-zero if any label differs or a score drifts past --atol.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from sentiment import load_model, predict_sentiment_batch  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default="sample_comments.csv")
+    parser.add_argument("--column", default="comment")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    comments = pd.read_csv(args.csv)[args.column].dropna().astype(str).tolist()
+
+    results = {}
+    for backend in ("pytorch", "onnx"):
+        load_model(backend)
+        start = time.perf_counter()
+        results[backend] = predict_sentiment_batch(
+            comments, token_budget=8192, use_cache=False, backend=backend
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{backend:8s} {len(comments) / elapsed:8.1f} comments/s")
+
+    (pt_labels, pt_scores), (ort_labels, ort_scores) = results.values()
+    label_mismatches = sum(a != b for a, b in zip(pt_labels, ort_labels))
+    max_score_diff = max(
+        (abs(a - b) for a, b in zip(pt_scores, ort_scores)), default=0.0
+    )
+    print(f"label mismatches: {label_mismatches}/{len(comments)}")
+    print(f"max score difference: {max_score_diff:.2e}")
+    if label_mismatches or max_score_diff > args.atol:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
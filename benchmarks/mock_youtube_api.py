@@ -0,0 +1,248 @@
+"""Local stand-in for the YouTube Data API commentThreads endpoint.
+
+Run:  python benchmarks/mock_youtube_api.py [--port 8080] [--comments 5000]
+Then point the app or scripts at it with
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8080
+Every video id gets --comments deterministic comments; --latency adds a
+per-request delay to mimic the real API round trip, and --error-rate makes
+that share of requests fail with a retryable 429/503. With --replies N,
+comment i has i % (N + 1) replies, served inline (up to 5, with
+part=snippet,replies) and by the comments endpoint (parentId=...).
+--quota N answers 403 quotaExceeded once N requests have been served. Like the real API it
+honours the `fields` parameter (partial response) and gzips the body for
+clients that send Accept-Encoding: gzip.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+WORDS = [
+    "great",
+    "video",
+    "terrible",
+    "editing",
+    "love",
+    "this",
+    "so",
+    "boring",
+    "thanks",
+    "for",
+    "the",
+    "tutorial",
+]
+
+
+def make_text(index):
+    return " ".join(WORDS[(index * 7 + i) % len(WORDS)] for i in range(index % 9 + 1))
+
+
+def make_reply(parent_id, index):
+    text = make_text(index + 3)
+    return {
+        "kind": "youtube#comment",
+        "id": f"{parent_id}.{index}",
+        "snippet": {
+            "textDisplay": text,
+            "textOriginal": text,
+            "parentId": parent_id,
+            "authorDisplayName": f"user{index % 97}",
+            "authorChannelId": {"value": f"UC{index % 97:022d}"},
+            "likeCount": index % 5,
+            "publishedAt": time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_760_000_000 + index * 60)
+            ),
+        },
+    }
+
+
+def reply_count(index, max_replies):
+    return index % (max_replies + 1)
+
+
+def make_thread(video_id, index, max_replies=0):
+    text = make_text(index)
+    comment_id = f"{video_id}-{index}"
+    return {
+        "kind": "youtube#commentThread",
+        "id": comment_id,
+        "snippet": {
+            "videoId": video_id,
+            "topLevelComment": {
+                "kind": "youtube#comment",
+                "id": comment_id,
+                "snippet": {
+                    "videoId": video_id,
+                    "textDisplay": text,
+                    "textOriginal": text,
+                    "authorDisplayName": f"user{index % 97}",
+                    "authorChannelId": {"value": f"UC{index % 97:022d}"},
+                    "likeCount": index % 13,
+                    # Newest first, one comment per minute
+                    "publishedAt": time.strftime(
+                        "%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_750_000_000 - index * 60)
+                    ),
+                },
+            },
+            "totalReplyCount": reply_count(index, max_replies),
+        },
+    }
+
+
+# Parse a `fields` selector such as "nextPageToken,items(id,snippet/title)"
+# into a nested dict: {"nextPageToken": None, "items": {"id": None, ...}}
+def parse_fields(fields):
+    tree, stack, name = {}, [], ""
+    node = tree
+    for char in fields + ",":
+        if char in ",()":
+            if name:
+                parts = name.strip().split("/")
+                leaf = node
+                for part in parts[:-1]:
+                    leaf = leaf.setdefault(part, {})
+                leaf.setdefault(parts[-1], None)
+                last = (leaf, parts[-1])
+                name = ""
+            if char == "(":
+                parent, key = last
+                if parent[key] is None:
+                    parent[key] = {}
+                stack.append(node)
+                node = parent[key]
+            elif char == ")":
+                node = stack.pop()
+        else:
+            name += char
+    return tree
+
+
+def select_fields(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [select_fields(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {k: select_fields(value[k], sub) for k, sub in tree.items() if k in value}
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    total_comments = 5000
+    latency = 0.0
+    error_rate = 0.0
+    max_replies = 0
+    quota = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not url.path.endswith(("/commentThreads", "/comments")):
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self.send_error(random.choice([429, 503]))
+            return
+        if Handler.quota is not None:
+            if Handler.quota <= 0:
+                self.send_json(
+                    403,
+                    {"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}},
+                )
+                return
+            Handler.quota -= 1
+
+        page_size = min(int(params.get("maxResults", 20)), 100)
+        start = int(params.get("pageToken") or 0)
+        if url.path.endswith("/comments"):
+            parent_id = params["parentId"]
+            total = reply_count(int(parent_id.rsplit("-", 1)[1]), self.max_replies)
+            end = min(start + page_size, total)
+            items = [make_reply(parent_id, i) for i in range(start, end)]
+            kind = "youtube#commentListResponse"
+        else:
+            video_id = params.get("videoId", "video")
+            total = self.total_comments
+            end = min(start + page_size, total)
+            items = [
+                make_thread(video_id, i, self.max_replies) for i in range(start, end)
+            ]
+            if "replies" in params.get("part", ""):
+                for item in items:
+                    top_id = item["snippet"]["topLevelComment"]["id"]
+                    count = item["snippet"]["totalReplyCount"]
+                    if count:
+                        item["replies"] = {
+                            "comments": [
+                                make_reply(top_id, i) for i in range(min(count, 5))
+                            ]
+                        }
+            kind = "youtube#commentThreadListResponse"
+        body = {
+            "kind": kind,
+            "items": items,
+            "pageInfo": {"totalResults": end - start, "resultsPerPage": page_size},
+        }
+        if end < total:
+            body["nextPageToken"] = str(end)
+
+        if params.get("fields"):
+            body = select_fields(body, parse_fields(params["fields"]))
+        self.send_json(200, body)
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8080, comments=5000, latency=0.0, error_rate=0.0, replies=0, quota=None):
+    Handler.total_comments = comments
+    Handler.latency = latency
+    Handler.error_rate = error_rate
+    Handler.max_replies = replies
+    Handler.quota = quota
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--replies", type=int, default=0)
+    parser.add_argument("--quota", type=int, default=None)
+    args = parser.parse_args()
+    server = serve(
+        args.port,
+        args.comments,
+        args.latency,
+        args.error_rate,
+        args.replies,
+        args.quota,
+    )
+    print(f"Mock YouTube API on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
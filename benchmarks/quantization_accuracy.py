@@ -0,0 +1,63 @@
+"""Report the accuracy cost of the int8 quantized backend.
+
+Run from the repo root:
+    python benchmarks/quantization_accuracy.py --csv labelled.csv \
+        [--text-column comment] [--label-column sentiment]
+The label column must hold negative/neutral/positive.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from sentiment import load_model, predict_sentiment_batch  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--text-column", default="comment")
+    parser.add_argument("--label-column", default="sentiment")
+    parser.add_argument("--baseline", default="onnx", choices=["pytorch", "onnx"])
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv).dropna(subset=[args.text_column, args.label_column])
+    comments = df[args.text_column].astype(str).tolist()
+    gold = df[args.label_column].str.lower().tolist()
+
+    predictions = {}
+    for backend in (args.baseline, "quantized"):
+        load_model(backend)
+        start = time.perf_counter()
+        labels, _ = predict_sentiment_batch(
+            comments, token_budget=8192, use_cache=False, backend=backend
+        )
+        elapsed = time.perf_counter() - start
+        accuracy = sum(p == g for p, g in zip(labels, gold)) / len(gold)
+        predictions[backend] = labels
+        print(
+            f"{backend:10s} accuracy {accuracy:7.2%}  "
+            f"{len(comments) / elapsed:8.1f} comments/s"
+        )
+
+    baseline, quantized = predictions[args.baseline], predictions["quantized"]
+    delta = (
+        sum(q == g for q, g in zip(quantized, gold))
+        - sum(b == g for b, g in zip(baseline, gold))
+    ) / len(gold)
+    agreement = sum(b == q for b, q in zip(baseline, quantized)) / len(gold)
+    print(f"accuracy delta (quantized - {args.baseline}): {delta:+.2%}")
+    print(f"label agreement with {args.baseline}: {agreement:.2%}")
+
+    for backend in ("onnx", "quantized"):
+        path = load_model(backend).model.path
+        print(f"{backend:10s} model file {os.path.getsize(path) / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Resumable bulk download of a video's comments to CSV.
+
+Run:  python bulk_crawl.py VIDEO_ID [--out comments.csv] [--replies]
+Every page is appended to the CSV as it arrives and the next page token is
+checkpointed next to it (<out>.checkpoint.json). Rerunning the same command
+after a crash or Ctrl-C resumes from the last checkpoint. The API key is
+read from YOUTUBE_API_KEY; quota is charged as a background crawl (see
+quota.py), so the crawl pauses at the daily limit and resumes at the reset.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from quota import BACKGROUND, QuotaScheduler
+from youtube import (
+    COMMENT_FIELDS,
+    REPLY_CONCURRENCY,
+    THREAD_FIELDS,
+    build_client,
+    expand_replies,
+    iter_comment_responses,
+    parse_comment_records,
+    parse_comment_threads,
+)
+
+COLUMNS = [
+    "video_id",
+    "comment_id",
+    "comment",
+    "published_at",
+    "like_count",
+    "author_channel_id",
+    "parent_id",
+    "reply_count",
+]
+
+
+def checkpoint_path(out):
+    return out + ".checkpoint.json"
+
+
+# None if there is nothing to resume: no checkpoint, or a CSV that was
+# deleted, moved or cut short since (truncating it to the checkpointed size
+# would pad it with NUL bytes), in which case the crawl starts over
+def load_checkpoint(out, video_id, log=None):
+    path = checkpoint_path(out)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    size = os.path.getsize(out) if os.path.exists(out) else None
+    if size is None or size < checkpoint["offset"]:
+        if log is not None:
+            log(f"{out} no longer matches {path}; starting the crawl over")
+        return None
+    if checkpoint["video_id"] != video_id:
+        raise SystemExit(
+            f"{out} holds a crawl of {checkpoint['video_id']}, not {video_id}"
+        )
+    return checkpoint
+
+
+# Written to a temporary file and renamed over the old one, so a crash never
+# leaves a half-written checkpoint
+def save_checkpoint(out, checkpoint):
+    path = checkpoint_path(out)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+# 🌟 Crawl `video_id` into the CSV at `out`, resuming from its checkpoint.
+# The checkpoint records the CSV size after the last complete page; on resume
+# anything past it (a page cut off mid-write) is truncated away before the
+# crawl continues from the checkpointed page token, so no row is lost or
+# written twice. Only one page is held in memory at a time. max_comments
+# counts top-level comments, across runs.
+def crawl_to_csv(
+    video_id,
+    out,
+    api_key,
+    max_comments=None,
+    replies=False,
+    reply_concurrency=REPLY_CONCURRENCY,
+    quota=None,
+    log=None,
+):
+    checkpoint = load_checkpoint(out, video_id, log) or {
+        "video_id": video_id,
+        "next_page_token": None,
+        "offset": 0,
+        "threads": 0,
+        "rows": 0,
+        "done": False,
+    }
+    if checkpoint["done"]:
+        return checkpoint
+    remaining = None
+    if max_comments is not None:
+        remaining = max_comments - checkpoint["threads"]
+        if remaining <= 0:
+            return checkpoint
+
+    youtube = build_client(api_key)
+    responses = iter_comment_responses(
+        youtube,
+        video_id,
+        remaining,
+        page_token=checkpoint["next_page_token"],
+        fields=THREAD_FIELDS if replies else COMMENT_FIELDS,
+        part="snippet,replies" if replies else "snippet",
+        quota=quota,
+    )
+    with open(out, "a+", newline="", encoding="utf-8") as f:
+        f.truncate(checkpoint["offset"])
+        f.seek(checkpoint["offset"])
+        writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore")
+        if checkpoint["offset"] == 0:
+            writer.writeheader()
+
+        for response in responses:
+            if replies:
+                threads = parse_comment_threads(response)
+                records = expand_replies(youtube, threads, reply_concurrency, quota)
+            else:
+                threads = records = parse_comment_records(response)
+            for record in records:
+                writer.writerow(
+                    {**record, "video_id": video_id, "comment": record["text"]}
+                )
+            f.flush()
+            os.fsync(f.fileno())
+
+            next_page_token = response.get("nextPageToken")
+            checkpoint["threads"] += len(threads)
+            checkpoint["rows"] += len(records)
+            checkpoint["offset"] = f.tell()
+            checkpoint["next_page_token"] = next_page_token
+            checkpoint["done"] = next_page_token is None
+            save_checkpoint(out, checkpoint)
+            if log is not None:
+                log(f"{checkpoint['rows']} comments written to {out}")
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("video_id")
+    parser.add_argument("--out", help="CSV path (default: <video_id>.csv)")
+    parser.add_argument("--max-comments", type=int, default=None)
+    parser.add_argument("--replies", action="store_true")
+    parser.add_argument("--reply-concurrency", type=int, default=REPLY_CONCURRENCY)
+    args = parser.parse_args()
+
+    api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not api_key:
+        raise SystemExit("Set YOUTUBE_API_KEY to the YouTube Data API key")
+    out = args.out or f"{args.video_id}.csv"
+    try:
+        checkpoint = crawl_to_csv(
+            args.video_id,
+            out,
+            api_key,
+            max_comments=args.max_comments,
+            replies=args.replies,
+            reply_concurrency=args.reply_concurrency,
+            quota=QuotaScheduler(priority=BACKGROUND),
+            log=lambda message: print(message, file=sys.stderr),
+        )
+    except KeyboardInterrupt:
+        raise SystemExit(f"Interrupted; rerun the same command to resume {out}")
+    status = "complete" if checkpoint["done"] else "stopped at --max-comments"
+    print(f"{checkpoint['rows']} comments in {out} ({status})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import re
+
+import pandas as pd
+
+_URL = re.compile(r"http\S+")
+_NON_ALNUM = re.compile(r"[^A-Za-z0-9\s]")
+_SPACES = re.compile(r"\s+")
+
+# Joins comments for the whole-column cleaner. It counts as whitespace for
+# \S, so a URL never runs into the next comment, and is kept by the
+# character filter.
+_SEP = "\x1f"
+# Non-ASCII characters matched by \s (i.e. str.isspace()); the character
+# filter keeps them and the whitespace collapse turns them into " "
+_UNICODE_SPACES = (
+    "\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008"
+    "\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+# ASCII bytes removed by [^A-Za-z0-9\s]
+_DELETE_ASCII = bytes(
+    b for b in range(128) if not (chr(b).isalnum() or chr(b).isspace())
+)
+
+
+# 🌟 Clean text function for CSV uploads
+def clean_text(text):
+    text = str(text)
+    text = _URL.sub("", text)
+    text = _NON_ALNUM.sub("", text)
+    text = _SPACES.sub(" ", text).strip()
+    return text
+
+
+# 🌟 Clean a whole column at once, with output identical to
+# series.apply(clean_text). The comments are joined into one string so the
+# URL regex runs once; the character filter becomes "drop non-ASCII, then
+# bytes.translate" and the whitespace collapse is str.split/join, all of
+# which run in C over the whole column.
+def clean_text_series(series):
+    values = [v if type(v) is str else str(v) for v in series.tolist()]
+    joined = _SEP.join(values)
+    if not values or joined.count(_SEP) != len(values) - 1:
+        # Some comment contains the separator itself: fall back to per-row
+        return series.apply(clean_text)
+
+    joined = _URL.sub("", joined)
+    for space in _UNICODE_SPACES:
+        if space in joined:
+            joined = joined.replace(space, " ")
+    kept = joined.encode("ascii", "ignore").translate(None, _DELETE_ASCII)
+    cleaned = [" ".join(value.split()) for value in kept.decode("ascii").split(_SEP)]
+    return pd.Series(cleaned, index=series.index)
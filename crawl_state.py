@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from youtube import iter_comment_pages, parse_comment_records
+
+DEFAULT_STATE_PATH = os.environ.get(
+    "CRAWL_STATE_PATH",
+    os.path.join(
+        os.path.expanduser("~"),
+        ".cache",
+        "youtube_comment_analysis",
+        "crawl_state.sqlite3",
+    ),
+)
+
+RESULT_COLUMNS = [
+    "comment_id",
+    "comment",
+    "published_at",
+    "like_count",
+    "author_channel_id",
+    "sentiment",
+    "score",
+]
+
+
+# 🌟 Per-video crawl state: the publishedAt watermark of the newest comment
+# already analyzed, every analyzed comment with its sentiment, and running
+# word counts, so a re-run's charts never re-read the video's history
+class CrawlState:
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                "video_id TEXT PRIMARY KEY, watermark TEXT, updated_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS comments ("
+                "video_id TEXT, comment_id TEXT, comment TEXT, published_at TEXT, "
+                "like_count INTEGER, author_channel_id TEXT, sentiment TEXT, "
+                "score REAL, PRIMARY KEY (video_id, comment_id))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS comments_published "
+                "ON comments (video_id, published_at)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS word_counts ("
+                "video_id TEXT, word TEXT, count INTEGER, "
+                "PRIMARY KEY (video_id, word))"
+            )
+
+    # Returns (watermark, ids of the comments published exactly at it); the
+    # ids break ties between comments posted in the same second
+    def watermark(self, video_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is None or row[0] is None:
+                return None, set()
+            ids = self._conn.execute(
+                "SELECT comment_id FROM comments "
+                "WHERE video_id = ? AND published_at = ?",
+                (video_id, row[0]),
+            ).fetchall()
+        return row[0], {comment_id for (comment_id,) in ids}
+
+    def known_ids(self, video_id, comment_ids):
+        comment_ids = list(comment_ids)
+        known = set()
+        with self._lock:
+            for start in range(0, len(comment_ids), 500):
+                chunk = comment_ids[start : start + 500]
+                rows = self._conn.execute(
+                    "SELECT comment_id FROM comments WHERE video_id = ? "
+                    "AND comment_id IN (%s)" % ",".join("?" * len(chunk)),
+                    [video_id, *chunk],
+                ).fetchall()
+                known.update(comment_id for (comment_id,) in rows)
+        return known
+
+    # Store analyzed records; `word_counts` (word -> frequency in these
+    # records) is added to the video's running totals in the same transaction
+    def add_results(self, video_id, records, sentiments, scores, word_counts=None):
+        rows = [
+            (
+                video_id,
+                r["comment_id"],
+                r["text"],
+                r["published_at"],
+                r["like_count"],
+                r["author_channel_id"],
+                sentiment,
+                score,
+            )
+            for r, sentiment, score in zip(records, sentiments, scores)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if word_counts:
+                self._add_word_counts(video_id, word_counts)
+
+    def _add_word_counts(self, video_id, word_counts):
+        self._conn.executemany(
+            "INSERT INTO word_counts VALUES (?, ?, ?) "
+            "ON CONFLICT (video_id, word) DO UPDATE SET count = count + excluded.count",
+            [(video_id, word, count) for word, count in word_counts.items()],
+        )
+
+    # Move the watermark up to the newest stored comment of the video
+    def advance_watermark(self, video_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos VALUES (?, "
+                "(SELECT MAX(published_at) FROM comments WHERE video_id = ?), ?)",
+                (video_id, video_id, time.time()),
+            )
+
+    # Stored comments per sentiment, counted by SQLite
+    def sentiment_counts(self, video_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sentiment, COUNT(*) FROM comments WHERE video_id = ? "
+                "GROUP BY sentiment",
+                (video_id,),
+            ).fetchall()
+        return dict(rows)
+
+    # The video's `limit` most frequent words (plenty for a word cloud)
+    def word_counts(self, video_id, limit=1000):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT word, count FROM word_counts WHERE video_id = ? "
+                "ORDER BY count DESC LIMIT ?",
+                (video_id, limit),
+            ).fetchall()
+        return dict(rows)
+
+    # 🌟 One-off rebuild of a video's word counts from its stored comments
+    # (state written before word counts were kept), `chunk_size` comments at a
+    # time; count_words maps a text to word -> frequency
+    def rebuild_word_counts(self, video_id, count_words, chunk_size=10_000):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT comment FROM comments WHERE video_id = ?", (video_id,)
+            )
+            word_counts = Counter()
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                word_counts.update(count_words(" ".join(text for (text,) in rows)))
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM word_counts WHERE video_id = ?", (video_id,)
+                )
+                self._add_word_counts(video_id, word_counts)
+
+    def results(self, video_id):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(RESULT_COLUMNS)} FROM comments "
+                "WHERE video_id = ? ORDER BY published_at DESC",
+                (video_id,),
+            ).fetchall()
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+# 🌟 Incremental fetch of the comments newer than a video's watermark.
+# Iterating yields pages of new comment records, newest first (order=time),
+# stopping at the first comment the watermark already covers. Comments that
+# are already stored (e.g. from an interrupted run) are skipped so they are
+# not classified twice. The caller stores each page with state.add_results
+# and calls commit() at the end; the watermark only moves once a run has
+# reached the old watermark (or the last comment), so an interrupted or
+# capped run never leaves a gap behind it. Only new comments count toward
+# max_comments, so consecutive capped runs keep working down towards the
+# watermark until they reach it.
+class IncrementalFetch:
+    def __init__(self, youtube, video_id, state, max_comments=None, quota=None):
+        self.youtube = youtube
+        self.video_id = video_id
+        self.state = state
+        self.max_comments = max_comments
+        self.quota = quota
+        self.complete = False
+
+    def __iter__(self):
+        self.complete = False
+        watermark, ids_at_watermark = self.state.watermark(self.video_id)
+        # Before the first watermark every comment is new, so the API can
+        # stop at the cap; afterwards already-stored comments don't count
+        # toward it and paging goes on until the cap or the watermark
+        pages = iter_comment_pages(
+            self.youtube,
+            self.video_id,
+            self.max_comments if watermark is None else None,
+            order="time",
+            parse=parse_comment_records,
+            quota=self.quota,
+        )
+        reached_watermark = False
+        capped = False
+        yielded = 0
+        for page in pages:
+            new = []
+            for record in page:
+                if watermark is not None and (
+                    record["published_at"] < watermark
+                    or (
+                        record["published_at"] == watermark
+                        and record["comment_id"] in ids_at_watermark
+                    )
+                ):
+                    reached_watermark = True
+                    break
+                new.append(record)
+            known = self.state.known_ids(self.video_id, (r["comment_id"] for r in new))
+            new = [r for r in new if r["comment_id"] not in known]
+            if self.max_comments is not None:
+                left = self.max_comments - yielded
+                capped = len(new) > left or (len(new) == left and not reached_watermark)
+                new = new[:left]
+            if new:
+                yielded += len(new)
+                yield new
+            if reached_watermark or capped:
+                pages.close()
+                break
+
+        # Uncapped, the run either reached the watermark or ran out of pages
+        self.complete = watermark is None or not capped
+
+    def commit(self):
+        if self.complete:
+            self.state.advance_watermark(self.video_id)
@@ -0,0 +1,184 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import httpx
+
+import metrics
+from youtube import (
+    API_ENDPOINT,
+    COMMENT_FIELDS,
+    DEFAULT_API_ENDPOINT,
+    PAGE_SIZE,
+    parse_comments,
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 403s worth retrying; others (quotaExceeded, commentsDisabled, forbidden)
+# will not change by waiting a few seconds
+RETRY_403_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Google APIs only gzip the response when the user agent contains "gzip"
+HEADERS = {
+    "Accept-Encoding": "gzip",
+    "User-Agent": "youtube-comment-analysis (gzip)",
+}
+
+
+class CrawlError(Exception):
+    pass
+
+
+# 🌟 Token bucket shared by every request of a crawl: `rate` quota units per
+# second, bursting up to `capacity`. commentThreads.list costs 1 unit.
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, cost=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((cost - self.tokens) / self.rate)
+
+
+def _error_reason(response):
+    try:
+        errors = response.json()["error"]["errors"]
+        return errors[0].get("reason")
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def _should_retry(response):
+    if response.status_code in RETRY_STATUSES:
+        return True
+    return response.status_code == 403 and _error_reason(response) in RETRY_403_REASONS
+
+
+class AsyncCrawler:
+    def __init__(
+        self,
+        api_key,
+        api_endpoint=None,
+        concurrency_per_host=8,
+        quota_rate=50.0,
+        quota_burst=100,
+        max_retries=5,
+        backoff_base=0.5,
+        backoff_max=32.0,
+        quota=None,
+    ):
+        self.api_key = api_key
+        self.url = (
+            f"{(api_endpoint or API_ENDPOINT or DEFAULT_API_ENDPOINT).rstrip('/')}"
+            "/youtube/v3/commentThreads"
+        )
+        self.concurrency_per_host = concurrency_per_host
+        self.bucket = TokenBucket(quota_rate, quota_burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Daily quota accounting (a quota.QuotaScheduler); the token bucket
+        # only paces requests within the day
+        self.quota = quota
+        self._host_limits = defaultdict(
+            lambda: asyncio.Semaphore(self.concurrency_per_host)
+        )
+
+    # Full-jitter exponential backoff
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def _get(self, client, params):
+        host = urlparse(self.url).netloc
+        attempt = 0
+        while attempt <= self.max_retries:
+            if self.quota is not None:
+                # May sleep until the quota resets, so keep it off the loop
+                await asyncio.to_thread(self.quota.charge, "commentThreads.list")
+            await self.bucket.acquire()
+            async with self._host_limits[host]:
+                try:
+                    with metrics.timer("fetch.commentThreads.list"):
+                        response = await client.get(self.url, params=params)
+                except httpx.TransportError as exc:
+                    if attempt == self.max_retries:
+                        raise CrawlError(f"{params['videoId']}: {exc}") from exc
+                    response = None
+            if response is not None:
+                if response.status_code == 200:
+                    return response.json()
+                # Out of daily quota: the next charge waits for the reset
+                if (
+                    self.quota is not None
+                    and response.status_code == 403
+                    and _error_reason(response) == "quotaExceeded"
+                    and self.quota.exhausted()
+                ):
+                    continue
+                if not _should_retry(response) or attempt == self.max_retries:
+                    raise CrawlError(
+                        f"{params['videoId']}: HTTP {response.status_code} "
+                        f"({_error_reason(response) or 'no reason'})"
+                    )
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    # 🌟 Same records as youtube_scraper: the video's top-level comment texts
+    async def fetch_video(self, client, video_id, max_comments=None):
+        comments, page_token = [], None
+        while max_comments is None or len(comments) < max_comments:
+            remaining = (
+                PAGE_SIZE if max_comments is None else max_comments - len(comments)
+            )
+            params = {
+                "part": "snippet",
+                "videoId": video_id,
+                "maxResults": min(PAGE_SIZE, remaining),
+                "textFormat": "plainText",
+                "fields": COMMENT_FIELDS,
+                "key": self.api_key,
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            response = await self._get(client, params)
+            comments.extend(parse_comments(response)[:remaining])
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return comments
+
+    # 🌟 Crawl many videos concurrently; returns {video_id: [comment, ...]}.
+    # With return_exceptions, a failed video maps to its CrawlError instead of
+    # aborting the whole crawl.
+    async def crawl(self, video_ids, max_comments=None, return_exceptions=False):
+        limits = httpx.Limits(max_connections=self.concurrency_per_host)
+        async with httpx.AsyncClient(
+            limits=limits, timeout=30.0, headers=HEADERS
+        ) as client:
+            results = await asyncio.gather(
+                *(self.fetch_video(client, v, max_comments) for v in video_ids),
+                return_exceptions=return_exceptions,
+            )
+        return dict(zip(video_ids, results))
+
+
+# 🌟 Synchronous entry point for scripts and the Streamlit app
+def crawl_videos(
+    video_ids, api_key, max_comments=None, return_exceptions=False, **kwargs
+):
+    crawler = AsyncCrawler(api_key, **kwargs)
+    return asyncio.run(crawler.crawl(video_ids, max_comments, return_exceptions))
@@ -0,0 +1,218 @@
+"""Shared sentiment model server with cross-request micro-batching.
+
+Run:  python inference_server.py [--port 8500] [--backend onnx]
+Then start the app (or any caller of sentiment.predict_sentiment_batch) with
+    SENTIMENT_SERVER_URL=http://127.0.0.1:8500
+and every process sends its comments here instead of loading its own copy
+of the model. Requests that arrive within --max-wait-ms of each other are
+run as one batch. Run one server per NUMA node (e.g. under
+`numactl --cpunodebind=N --membind=N`) and point each node's app replicas at
+it. GET /metrics serves the server's stage timings for Prometheus.
+"""
+
+import argparse
+import functools
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+
+# Comments per request sent by predict_remote, and requests in flight at once
+CLIENT_CHUNK_SIZE = 128
+CLIENT_CONCURRENCY = 4
+
+
+# 🌟 Collects concurrent requests into batches: the first request waits at
+# most `max_wait` seconds for others to join, and a batch closes early once
+# it holds `max_batch_size` comments. One thread runs the model, so batches
+# never compete for the CPU with each other.
+class MicroBatcher:
+    def __init__(self, predict, max_batch_size=256, max_wait=0.01):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self.comments = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Returns a Future of (labels, scores) for `texts`
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                with metrics.timer("server.batch"):
+                    labels, scores = self.predict(texts)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.requests += len(batch)
+            self.batches += 1
+            self.comments += len(texts)
+            start = 0
+            for request_texts, future in batch:
+                end = start + len(request_texts)
+                future.set_result((labels[start:end], scores[start:end]))
+                start = end
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "comments": self.comments,
+            "mean_batch_size": self.comments / max(self.batches, 1),
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    batcher = None
+    backend = None
+
+    # POST /predict {"texts": [...]} -> {"labels": [...], "scores": [...]}
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            texts = [str(text) for text in json.loads(self.rfile.read(length))["texts"]]
+        except (ValueError, KeyError, TypeError) as exc:
+            self.send_json(400, {"error": f"bad request: {exc}"})
+            return
+        try:
+            labels, scores = self.batcher.submit(texts).result()
+        except Exception as exc:
+            self.send_json(500, {"error": str(exc)})
+            return
+        self.send_json(200, {"labels": labels, "scores": scores})
+
+    # GET /health -> backend and batching statistics; GET /metrics -> stage
+    # timings in Prometheus text format (see metrics.py)
+    def do_GET(self):
+        if self.path == "/metrics":
+            payload = metrics.REGISTRY.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        if self.path != "/health":
+            self.send_json(404, {"error": "not found"})
+            return
+        self.send_json(
+            200, {"status": "ok", "backend": self.backend, **self.batcher.stats()}
+        )
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8500, batcher=None, backend=None):
+    Handler.batcher = batcher
+    Handler.backend = backend
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+@functools.lru_cache(maxsize=None)
+def _client(server_url):
+    import httpx
+
+    return httpx.Client(base_url=server_url, timeout=300.0)
+
+
+def _post_chunk(server_url, texts):
+    response = _client(server_url).post("/predict", json={"texts": texts})
+    response.raise_for_status()
+    body = response.json()
+    return body["labels"], body["scores"]
+
+
+# 🌟 Client side, used by sentiment.predict_sentiment_batch when
+# SENTIMENT_SERVER_URL is set. Comments go out in small chunks, a few at a
+# time, so one large job can't hold the server's batches to itself.
+def predict_remote(texts, server_url, progress_callback=None):
+    chunks = [
+        texts[i : i + CLIENT_CHUNK_SIZE]
+        for i in range(0, len(texts), CLIENT_CHUNK_SIZE)
+    ]
+    labels, scores = [], []
+    with ThreadPoolExecutor(CLIENT_CONCURRENCY) as executor:
+        results = executor.map(functools.partial(_post_chunk, server_url), chunks)
+        for chunk_labels, chunk_scores in results:
+            labels.extend(chunk_labels)
+            scores.extend(chunk_scores)
+            if progress_callback is not None:
+                progress_callback(len(labels), len(texts))
+    return labels, scores
+
+
+def main():
+    from sentiment import DEFAULT_BACKEND, predict_sentiment_batch, warmup
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--backend", default=DEFAULT_BACKEND)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    args = parser.parse_args()
+
+    warmup(args.backend, server_url=None)
+    batcher = MicroBatcher(
+        functools.partial(
+            predict_sentiment_batch,
+            token_budget=args.token_budget,
+            backend=args.backend,
+            server_url=None,
+        ),
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+    )
+    server = serve(args.host, args.port, batcher, args.backend)
+    print(f"Sentiment server ({args.backend}) on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
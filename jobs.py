@@ -0,0 +1,149 @@
+import collections
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import metrics
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Jobs that may run at once; more wait in the pool's queue. Threads are
+# enough: tokenization and the forward pass release the GIL, and workers>1
+# (SENTIMENT_WORKERS) already fans inference out to processes.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Result rows a job keeps for display while it runs; full results go to the
+# store/CSV
+MAX_PARTIAL_ROWS = int(os.environ.get("UI_MAX_TABLE_ROWS", "10000"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# 🌟 State of one background job, written by the job's thread and read by
+# the UI: status, a progress message/fraction, the first rows of its results
+# and, once done, the job function's return value (or its exception).
+# `metrics` holds the job's own stage timings (see metrics.collect)
+class Job:
+    def __init__(self, kind, max_rows=MAX_PARTIAL_ROWS):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = PENDING
+        self.message = "Waiting to start..."
+        self.fraction = None
+        self.result = None
+        self.error = None
+        self.metrics = None
+        self.created = time.time()
+        self.finished = None
+        self.max_rows = max_rows
+        self.total_rows = 0
+        self._frames = []
+        self._kept = 0
+        self._files = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def report(self, message, fraction=None):
+        self.message = message
+        if fraction is not None:
+            self.fraction = min(max(fraction, 0.0), 1.0)
+
+    # Partial results; only the first max_rows rows are kept
+    def append(self, df):
+        with self._lock:
+            self.total_rows += len(df)
+            if self._kept < self.max_rows:
+                df = df.iloc[: self.max_rows - self._kept]
+                self._frames.append(df)
+                self._kept += len(df)
+
+    def frame(self):
+        with self._lock:
+            if not self._frames:
+                return pd.DataFrame()
+            if len(self._frames) > 1:
+                self._frames = [pd.concat(self._frames, ignore_index=True)]
+            return self._frames[0]
+
+    # Delete `path` (e.g. a result file) when the job manager forgets the job
+    def keep_file(self, path):
+        self._files.append(path)
+
+    def remove_files(self):
+        for path in self._files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._files = []
+
+    def cancel(self):
+        self._cancel.set()
+
+    # Called by job functions between units of work (pages, chunks)
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+# 🌟 Runs jobs on a thread pool so they outlive the Streamlit script run
+# that started them. One manager per server process (st.cache_resource);
+# sessions keep the ids of their jobs in st.session_state and poll them.
+# Finished jobs are forgotten oldest first once more than `keep_finished`
+# have piled up, and their files (Job.keep_file) are deleted.
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, keep_finished=50):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="job")
+        self._jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    # Start fn(job, *args, **kwargs) in the background and return its Job;
+    # fn's return value becomes job.result
+    def submit(self, kind, fn, *args, **kwargs):
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        if job._cancel.is_set():
+            # The job function never runs, so it can't clean up after itself
+            job.status = CANCELLED
+            job.remove_files()
+        else:
+            job.status = RUNNING
+            try:
+                with metrics.collect() as job.metrics:
+                    job.result = fn(job, *args, **kwargs)
+                job.status = DONE
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as exc:
+                job.error = exc
+                job.status = FAILED
+        job.finished = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(len(finished) - self.keep_finished, 0)]:
+            self._jobs.pop(job_id).remove_files()
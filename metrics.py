@@ -0,0 +1,228 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 🌟 Histogram bucket upper bounds in seconds, from one API page or model
+# batch (milliseconds) up to a whole bulk job
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    math.inf,
+)
+
+PROMETHEUS_PREFIX = "ytsent"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Cumulative counts per upper bound, as Prometheus expects
+    def cumulative(self):
+        total, counts = 0, []
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            total += count
+            counts.append((bound, total))
+        return counts
+
+
+# 🌟 Thread-safe set of stage timings (one histogram per stage) and counters.
+# REGISTRY below covers the whole process; collect() makes one per run.
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    # 🌟 Plain-dict copy, for json.dumps
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": {
+                            _format_bound(bound): count
+                            for bound, count in histogram.cumulative()
+                        },
+                    }
+                    for stage, histogram in sorted(self.histograms.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    # 🌟 One row per stage, slowest first: calls, total and mean seconds, and
+    # share of the summed stage time (stages can nest or overlap, so the
+    # shares say where time goes, not how long the run took)
+    def breakdown(self):
+        stages = self.snapshot()["stages"]
+        total = sum(stats["sum"] for stats in stages.values()) or 1.0
+        rows = [
+            {
+                "stage": stage,
+                "calls": stats["count"],
+                "total_s": stats["sum"],
+                "mean_ms": 1000 * stats["sum"] / max(stats["count"], 1),
+                "share": stats["sum"] / total,
+            }
+            for stage, stats in stages.items()
+        ]
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+    # 🌟 Prometheus text exposition format: one <prefix>_stage_seconds
+    # histogram labelled by stage, and one <prefix>_<name>_total per counter
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, stats in snapshot["stages"].items():
+            for bound, count in stats["buckets"].items():
+                lines.append(
+                    f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} '
+                    f"{count}"
+                )
+            lines.append(
+                f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]}'
+            )
+            lines.append(
+                f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}'
+            )
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(bound)
+
+
+REGISTRY = Metrics()
+
+# The Metrics of the run being collected (see collect()), if any. Threads
+# started with a copy of the caller's context report to the same run.
+_current_run = contextvars.ContextVar("metrics_run", default=None)
+
+
+def observe(stage, seconds):
+    REGISTRY.observe(stage, seconds)
+    run = _current_run.get()
+    if run is not None:
+        run.observe(stage, seconds)
+
+
+def increment(name, value=1):
+    REGISTRY.increment(name, value)
+    run = _current_run.get()
+    if run is not None:
+        run.increment(name, value)
+
+
+# 🌟 Time the block as one observation of `stage`, e.g.
+#     with metrics.timer("forward"):
+#         logits = model(**inputs).logits
+@contextlib.contextmanager
+def timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+# 🌟 Collect the timings and counters of one run (a job, a CLI invocation)
+# on their own, besides adding them to REGISTRY as usual
+@contextlib.contextmanager
+def collect():
+    run = Metrics()
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+# 🌟 Write `registry` to `path`: Prometheus text for a .prom file (e.g. for
+# node_exporter's textfile collector), JSON otherwise
+def dump(path, registry=REGISTRY):
+    if path.endswith(".prom"):
+        content = registry.to_prometheus()
+    else:
+        content = registry.to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    # GET /metrics -> Prometheus text; GET /metrics.json -> JSON
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = self.registry.to_prometheus()
+            content_type = PROMETHEUS_CONTENT_TYPE
+        elif self.path == "/metrics.json":
+            body = self.registry.to_json()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# 🌟 Serve REGISTRY for Prometheus on a background thread
+def start_http_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
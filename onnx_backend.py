@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import onnxruntime as ort
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+DEFAULT_ONNX_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "youtube_comment_analysis", "onnx"
+)
+
+
+# 🌟 Export the PyTorch model to ONNX once; later loads reuse the file on disk
+def export_onnx(model_id, path):
+    model = AutoModelForSequenceClassification.from_pretrained(model_id)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    dummy = tokenizer(["export", "dummy input"], padding=True, return_tensors="pt")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=14,
+        )
+    # Atomic rename so concurrent workers never load a half-written graph
+    os.replace(tmp_path, path)
+    return path
+
+
+def onnx_model_path(model_id, revision, onnx_dir=DEFAULT_ONNX_DIR, name="model"):
+    return os.path.join(onnx_dir, model_id.replace("/", "--"), revision, f"{name}.onnx")
+
+
+# 🌟 Stand-in for the PyTorch model: same call signature and `.logits` output,
+# so the batching code in sentiment.py runs unchanged on either backend
+class OnnxSequenceClassifier:
+    def __init__(self, path, config, intra_op_threads=0):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.config = config
+        self.path = path
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        (logits,) = self.session.run(
+            ["logits"],
+            {
+                "input_ids": input_ids.numpy().astype(np.int64),
+                "attention_mask": attention_mask.numpy().astype(np.int64),
+            },
+        )
+        return SequenceClassifierOutput(logits=torch.from_numpy(logits))
+
+
+# 🌟 Mirrors the `.tokenizer` / `.model` attributes of a transformers pipeline
+class OnnxClassifier:
+    def __init__(self, tokenizer, model):
+        self.tokenizer = tokenizer
+        self.model = model
+
+
+# 🌟 Dynamic int8 quantization of the exported graph: weights of the MatMul
+# (linear) layers are stored as int8, activations are quantized on the fly
+def quantize_onnx(fp32_path, path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    quantize_dynamic(
+        fp32_path,
+        tmp_path,
+        op_types_to_quantize=["MatMul"],
+        weight_type=QuantType.QInt8,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_onnx_classifier(model_id, onnx_dir=DEFAULT_ONNX_DIR, quantized=False):
+    config = AutoConfig.from_pretrained(model_id)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    revision = getattr(config, "_commit_hash", None) or "unknown"
+    path = onnx_model_path(model_id, revision, onnx_dir)
+    if not os.path.exists(path):
+        export_onnx(model_id, path)
+    if quantized:
+        fp32_path = path
+        path = onnx_model_path(model_id, revision, onnx_dir, name="model-int8")
+        if not os.path.exists(path):
+            quantize_onnx(fp32_path, path)
+    # Follow torch's thread setting so pool workers stay within their core share
+    model = OnnxSequenceClassifier(
+        path, config, intra_op_threads=torch.get_num_threads()
+    )
+    return OnnxClassifier(tokenizer, model)
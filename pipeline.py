@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+from cleaning import clean_text_series
+from sentiment import DEFAULT_WORKERS, predict_sentiment_batch
+from streaming import run_pipeline
+from youtube import records_to_frame
+
+# 🌟 Rows per chunk when a CSV is analyzed in streaming mode
+CSV_CHUNK_ROWS = 50_000
+TOKEN_BUDGET = 8192
+
+
+# 🌟 Lower-case the columns and add clean_comment if the CSV doesn't have one
+def prepare_comments(df):
+    df.columns = df.columns.str.lower()
+    if "clean_comment" not in df.columns:
+        if "comment" not in df.columns:
+            raise ValueError("No 'comment' column found in uploaded CSV.")
+        with metrics.timer("clean"):
+            df["clean_comment"] = clean_text_series(df["comment"])
+        metrics.increment("comments_cleaned", len(df))
+    return df
+
+
+# 🌟 Add sentiment/score columns. Each distinct cleaned comment is classified
+# once and the results are broadcast back to every row through the factorize
+# codes; returns the number of unique comments. The keyword arguments are
+# passed to sentiment.predict_sentiment_batch.
+def add_sentiment(
+    df,
+    progress_callback=None,
+    batch_size=32,
+    token_budget=TOKEN_BUDGET,
+    workers=DEFAULT_WORKERS,
+    backend=None,
+):
+    codes, uniques = pd.factorize(df["clean_comment"])
+
+    # Empty comments are neutral; the extra last slot is where NaN rows
+    # (code -1) land
+    unique_sentiments = np.full(len(uniques) + 1, "neutral", dtype=object)
+    unique_scores = np.zeros(len(uniques) + 1)
+    to_classify = [i for i, comment in enumerate(uniques) if str(comment).strip() != ""]
+
+    labels, label_scores = predict_sentiment_batch(
+        [uniques[i] for i in to_classify],
+        batch_size=batch_size,
+        token_budget=token_budget,
+        progress_callback=progress_callback,
+        workers=workers,
+        backend=backend,
+    )
+    unique_sentiments[to_classify] = labels
+    unique_scores[to_classify] = label_scores
+
+    df["sentiment"] = unique_sentiments[codes]
+    df["score"] = unique_scores[codes]
+    return len(uniques)
+
+
+# 🌟 Word frequencies as the word cloud counts them (stopwords removed)
+def word_frequencies(text):
+    from wordcloud import WordCloud
+
+    with metrics.timer("wordcloud.frequencies"):
+        return WordCloud().process_text(text)
+
+
+# 🌟 Classify pages of comment records (youtube.iter_comment_records,
+# crawl_state.IncrementalFetch, ...) as they arrive: fetching runs on its own
+# thread, so the next page downloads while this one is classified. Yields
+# (records, DataFrame with sentiment/score columns) per non-empty page; the
+# keyword arguments are passed to sentiment.predict_sentiment_batch.
+def iter_classified_pages(pages, **predict_options):
+    def classify_page(page):
+        texts = [record["text"] for record in page]
+        sentiments, scores = predict_sentiment_batch(texts, **predict_options)
+        return page, records_to_frame(page).assign(sentiment=sentiments, score=scores)
+
+    results = run_pipeline(pages, [classify_page])
+    try:
+        for page, df in results:
+            if page:
+                yield page, df
+    finally:
+        results.close()
+
+
+# 🌟 Read a CSV (path or file object) `chunk_rows` rows at a time and yield
+# each chunk cleaned and classified, so only one chunk is in memory at once.
+# `dtype` is passed to pandas.read_csv; the other keyword arguments to
+# add_sentiment.
+def iter_classified_csv(source, chunk_rows=CSV_CHUNK_ROWS, dtype=None, **options):
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype=dtype):
+        chunk = prepare_comments(chunk)
+        add_sentiment(chunk, **options)
+        yield chunk
@@ -0,0 +1,161 @@
+import datetime
+import math
+import os
+import sqlite3
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+DEFAULT_QUOTA_PATH = os.environ.get(
+    "YOUTUBE_QUOTA_PATH",
+    os.path.join(
+        os.path.expanduser("~"), ".cache", "youtube_comment_analysis", "quota.sqlite3"
+    ),
+)
+# Units per day granted to the API key (10,000 by default)
+DAILY_QUOTA = int(os.environ.get("YOUTUBE_DAILY_QUOTA", "10000"))
+# Units only interactive requests may spend, so a background crawl never
+# locks the dashboards out for the rest of the day
+INTERACTIVE_RESERVE = int(os.environ.get("YOUTUBE_INTERACTIVE_RESERVE", "500"))
+
+# 🌟 Unit cost of each API method we call (a call costs the same whatever its
+# `part` and maxResults, so full 100-comment pages give the most comments
+# per unit)
+COSTS = {
+    "commentThreads.list": 1,
+    "comments.list": 1,
+    "videos.list": 1,
+    "search.list": 100,
+}
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Daily quotas reset at midnight Pacific Time
+RESET_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+def quota_day(now=None):
+    now = datetime.datetime.now(RESET_TIMEZONE) if now is None else now
+    return now.astimezone(RESET_TIMEZONE).date().isoformat()
+
+
+# Seconds until the next midnight Pacific Time
+def seconds_until_reset(now=None):
+    now = datetime.datetime.now(RESET_TIMEZONE) if now is None else now
+    now = now.astimezone(RESET_TIMEZONE)
+    midnight = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time(), RESET_TIMEZONE
+    )
+    return max((midnight - now).total_seconds(), 0.0)
+
+
+# 🌟 Estimated units to fetch max_comments top-level comments, one call per
+# page (replies are extra: one call per page of each thread with more than 5)
+def estimate_units(max_comments, page_size=100, method="commentThreads.list"):
+    return math.ceil(max_comments / page_size) * COSTS[method]
+
+
+# 🌟 Daily quota accounting shared by every process using the API key. Usage
+# is kept per Pacific-time day in SQLite and every charge is checked and
+# recorded in one write transaction, so concurrent dashboards and crawls never
+# overspend together. Interactive requests may spend the whole daily quota
+# and raise QuotaExceeded once it is gone; background ones stop
+# `interactive_reserve` units short of it and then wait for the reset
+# (pausing the crawl instead of failing it). Pass an instance as `quota` to
+# the youtube.py fetch functions or crawler.AsyncCrawler.
+class QuotaScheduler:
+    def __init__(
+        self,
+        path=DEFAULT_QUOTA_PATH,
+        daily_limit=DAILY_QUOTA,
+        interactive_reserve=INTERACTIVE_RESERVE,
+        priority=INTERACTIVE,
+        poll_interval=60.0,
+    ):
+        if priority not in (INTERACTIVE, BACKGROUND):
+            raise ValueError(f"Unknown priority: {priority!r}")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.daily_limit = daily_limit
+        self.interactive_reserve = interactive_reserve
+        self.priority = priority
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                "day TEXT, method TEXT, units INTEGER, PRIMARY KEY (day, method))"
+            )
+
+    @property
+    def limit(self):
+        if self.priority == INTERACTIVE:
+            return self.daily_limit
+        return self.daily_limit - self.interactive_reserve
+
+    # Record `units` (default: the method's cost) if they fit under this
+    # priority's limit; returns False without recording anything otherwise
+    def try_charge(self, method, units=None):
+        units = COSTS.get(method, 1) if units is None else units
+        day = quota_day()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (used,) = self._conn.execute(
+                    "SELECT COALESCE(SUM(units), 0) FROM usage WHERE day = ?", (day,)
+                ).fetchone()
+                if used + units > self.limit:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT INTO usage VALUES (?, ?, ?) ON CONFLICT (day, method) "
+                    "DO UPDATE SET units = units + excluded.units",
+                    (day, method, units),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def charge(self, method, units=None):
+        while not self.try_charge(method, units):
+            if self.priority == INTERACTIVE:
+                raise QuotaExceeded(
+                    f"Daily YouTube API quota of {self.daily_limit} units used up; "
+                    f"it resets in {seconds_until_reset() / 3600:.1f}h"
+                )
+            time.sleep(min(self.poll_interval, seconds_until_reset() + 1))
+
+    # The API answered quotaExceeded (e.g. the key is also used elsewhere):
+    # mark today's quota as spent so further charges wait or raise. Returns
+    # True, meaning the call may be retried after charging again.
+    def exhausted(self):
+        day = quota_day()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO usage VALUES (?, 'quotaExceeded', ?) "
+                "ON CONFLICT (day, method) DO UPDATE SET units = excluded.units",
+                (day, self.daily_limit),
+            )
+        return True
+
+    # {method: units} spent today (plus "total" and "remaining")
+    def usage(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT method, units FROM usage WHERE day = ?", (quota_day(),)
+            ).fetchall()
+        usage = dict(rows)
+        usage["total"] = min(sum(usage.values()), self.daily_limit)
+        usage["remaining"] = self.daily_limit - usage["total"]
+        return usage
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from jobs import CANCELLED, DONE, FAILED
+
+# 🌟 How often the page polls a running job. Each poll redraws its status
+# and results once, so the websocket traffic depends on this rate, not on
+# how many comments the job processes.
+UPDATE_INTERVAL = float(os.environ.get("UI_UPDATE_INTERVAL", "0.5"))
+
+
+# 🌟 Results in one dataframe element (scrollable and virtualized by the
+# browser) instead of one element per comment
+def render_results(frame, total_rows):
+    if frame.empty:
+        return
+    st.dataframe(frame, hide_index=True)
+    if total_rows > len(frame):
+        st.caption(f"Showing the first {len(frame)} of {total_rows} rows")
+
+
+def render_job_status(job):
+    if job.fraction is not None:
+        st.progress(job.fraction)
+    st.text(job.message)
+    render_results(job.frame(), job.total_rows)
+
+
+# 🌟 Collapsed table of where a finished job spent its time, from the stage
+# timers in metrics.py
+def render_timings(job):
+    if job.metrics is None:
+        return
+    breakdown = job.metrics.breakdown()
+    if not breakdown:
+        return
+    with st.expander("⏱️ Time by stage"):
+        st.dataframe(
+            pd.DataFrame(breakdown),
+            hide_index=True,
+            column_config={
+                "total_s": st.column_config.NumberColumn("total (s)", format="%.3f"),
+                "mean_ms": st.column_config.NumberColumn("mean (ms)", format="%.1f"),
+                "share": st.column_config.ProgressColumn(
+                    "share", min_value=0.0, max_value=1.0, format="percent"
+                ),
+            },
+        )
+
+
+# Only this fragment reruns while the job is in flight; once the job ends
+# the whole page reruns to draw the final results
+@st.fragment(run_every=UPDATE_INTERVAL)
+def _poll_job(job):
+    if st.button("Cancel", key=f"cancel-{job.id}"):
+        job.cancel()
+    render_job_status(job)
+    if job.done:
+        st.rerun()
+
+
+# 🌟 Draw a jobs.Job: live progress and partial results while it runs, then
+# its results, with render_result(job.result) for whatever else the job
+# produced (charts, downloads)
+def render_job(job, render_result):
+    if not job.done:
+        _poll_job(job)
+        return
+    if job.status == FAILED:
+        st.error(f"Analysis failed: {job.error}")
+    elif job.status == CANCELLED:
+        st.warning(f"Cancelled. {job.message}")
+    else:
+        st.text(job.message)
+    render_results(job.frame(), job.total_rows)
+    if job.status == DONE:
+        render_result(job.result)
+    render_timings(job)
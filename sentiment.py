@@ -0,0 +1,236 @@
+import functools
+import os
+import threading
+
+import metrics
+from sentiment_cache import DEFAULT_CACHE_PATH, SentimentCache, cache_key
+
+MODEL_ID = "cardiffnlp/twitter-roberta-base-sentiment"
+
+# 🌟 Label mapping for human-readable output
+label_map = {"LABEL_0": "negative", "LABEL_1": "neutral", "LABEL_2": "positive"}
+
+
+# 🌟 Inference backend: "pytorch" (transformers pipeline), "onnx" (ONNX Runtime)
+# or "quantized" (ONNX Runtime with dynamic int8 weights)
+BACKENDS = ("pytorch", "onnx", "quantized")
+DEFAULT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "pytorch")
+
+# 🌟 Worker processes for large jobs (see workers.py); 1 runs in-process
+DEFAULT_WORKERS = int(os.environ.get("SENTIMENT_WORKERS", 1))
+
+# 🌟 URL of a shared inference server (see inference_server.py). When set,
+# predictions are made there and this process never loads the model.
+DEFAULT_SERVER_URL = os.environ.get("SENTIMENT_SERVER_URL")
+
+
+_load_lock = threading.Lock()
+
+
+# 🌟 Load the model once per process (Streamlit reruns reuse the same instance).
+# torch/transformers are imported here rather than at module level so that
+# importing this module stays cheap; concurrent callers wait for one load.
+def load_model(backend=None):
+    with _load_lock:
+        return _load_model(backend or DEFAULT_BACKEND)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_model(backend):
+    with metrics.timer("model.load"):
+        return _build_classifier(backend)
+
+
+def _build_classifier(backend):
+    if backend == "pytorch":
+        from transformers import pipeline
+
+        classifier = pipeline("sentiment-analysis", model=MODEL_ID)
+    elif backend in ("onnx", "quantized"):
+        from onnx_backend import load_onnx_classifier
+
+        classifier = load_onnx_classifier(MODEL_ID, quantized=backend == "quantized")
+    else:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    return classifier
+
+
+# 🌟 Warmup hook: load the model and run one forward pass so the first real
+# request doesn't pay for weight loading or lazy kernel initialization
+def warmup(backend=None, server_url=DEFAULT_SERVER_URL):
+    if server_url:
+        return
+    load_model(backend)
+    predict_sentiment_batch(
+        ["warm up"], use_cache=False, backend=backend, server_url=None
+    )
+
+
+# 🌟 Persistent result cache; set SENTIMENT_CACHE=0 to disable
+@functools.lru_cache(maxsize=None)
+def get_cache():
+    if os.environ.get("SENTIMENT_CACHE", "1") == "0":
+        return None
+    return SentimentCache(
+        os.environ.get("SENTIMENT_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_entries=int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", 1_000_000)),
+    )
+
+
+# 🌟 Hub commit of the loaded weights, so a model update invalidates the cache
+def model_revision(backend=None):
+    config = load_model(backend).model.config
+    return getattr(config, "_commit_hash", None) or "unknown"
+
+
+# Backends agree on labels but not bit-for-bit on scores, so each gets its own keys
+def _cache_keys(texts, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    revision = model_revision(backend)
+    return [cache_key(f"{MODEL_ID}:{backend}", revision, text) for text in texts]
+
+
+# 🌟 Function to predict sentiment
+def predict_sentiment(comment, use_cache=True, backend=None):
+    labels, scores = predict_sentiment_batch(
+        [comment], use_cache=use_cache, backend=backend
+    )
+    return labels[0], scores[0]
+
+
+# 🌟 Fixed-size batches in input order
+def fixed_size_batches(lengths, batch_size):
+    indices = list(range(len(lengths)))
+    return [indices[i : i + batch_size] for i in range(0, len(indices), batch_size)]
+
+
+# 🌟 Length-bucketed batches: sort by token length and fill each batch until
+# its padded size (longest member x batch size) would exceed the token budget
+def length_bucketed_batches(lengths, token_budget, max_batch_size=256):
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches, batch, longest = [], [], 0
+    for i in order:
+        padded = max(longest, lengths[i]) * (len(batch) + 1)
+        if batch and (padded > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, longest = [], 0
+        batch.append(i)
+        longest = max(longest, lengths[i])
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# 🌟 Batched prediction: tokenize once, then run the model on padded mini-batches.
+# With token_budget set, batches are formed by length bucketing instead of a
+# fixed count; results are always returned in the original comment order.
+# Comments already in the result cache are answered from it and never reach
+# the model. `backend` overrides SENTIMENT_BACKEND for this call; with
+# workers > 1 the uncached comments are sharded across a process pool. With
+# server_url (default SENTIMENT_SERVER_URL) everything is delegated to the
+# inference server, which applies its own cache, backend and batching.
+def predict_sentiment_batch(
+    comments,
+    batch_size=32,
+    token_budget=None,
+    progress_callback=None,
+    use_cache=True,
+    backend=None,
+    workers=1,
+    server_url=DEFAULT_SERVER_URL,
+):
+    texts = [str(c) for c in comments]
+    metrics.increment("comments_predicted", len(texts))
+    if server_url:
+        from inference_server import predict_remote
+
+        with metrics.timer("predict.remote"):
+            return predict_remote(texts, server_url, progress_callback)
+
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return _predict_uncached(
+            texts, batch_size, token_budget, progress_callback, backend, workers
+        )
+
+    with metrics.timer("cache.lookup"):
+        keys = _cache_keys(texts, backend)
+        cached = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    metrics.increment("cache_hits", len(texts) - len(missing))
+    if progress_callback is not None and len(missing) < len(texts):
+        progress_callback(len(texts) - len(missing), len(texts))
+
+    def offset_progress(done, total):
+        progress_callback(len(texts) - total + done, len(texts))
+
+    new_labels, new_scores = _predict_uncached(
+        [texts[i] for i in missing],
+        batch_size,
+        token_budget,
+        offset_progress if progress_callback is not None else None,
+        backend,
+        workers,
+    )
+    with metrics.timer("cache.store"):
+        cache.put_many(
+            (keys[i], label, score)
+            for i, label, score in zip(missing, new_labels, new_scores)
+        )
+
+    results = dict(cached)
+    results.update(
+        (keys[i], (label, score))
+        for i, label, score in zip(missing, new_labels, new_scores)
+    )
+    labels = [results[key][0] for key in keys]
+    scores = [results[key][1] for key in keys]
+    return labels, scores
+
+
+def _predict_uncached(
+    texts, batch_size, token_budget, progress_callback, backend, workers=1
+):
+    if workers > 1 and texts:
+        from workers import predict_in_pool
+
+        # Tokenization and forward passes happen in the worker processes and
+        # are only timed here as a whole
+        metrics.increment("comments_inferred", len(texts))
+        with metrics.timer("predict.pool"):
+            return predict_in_pool(
+                texts, workers, batch_size, token_budget, progress_callback, backend
+            )
+
+    import torch
+
+    classifier = load_model(backend)
+    tokenizer, model = classifier.tokenizer, classifier.model
+    id2label = model.config.id2label
+
+    metrics.increment("comments_inferred", len(texts))
+    with metrics.timer("tokenize"):
+        input_ids = tokenizer(texts, truncation=True)["input_ids"] if texts else []
+    lengths = [len(ids) for ids in input_ids]
+    if token_budget is None:
+        batches = fixed_size_batches(lengths, batch_size)
+    else:
+        batches = length_bucketed_batches(lengths, token_budget)
+
+    labels, scores = [None] * len(texts), [0.0] * len(texts)
+    done = 0
+    for batch in batches:
+        with metrics.timer("tokenize.pad"):
+            inputs = tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in batch]}, return_tensors="pt"
+            )
+        with metrics.timer("forward"), torch.no_grad():
+            logits = model(**inputs).logits
+        probs, ids = logits.softmax(dim=-1).max(dim=-1)
+        for i, label_id, score in zip(batch, ids.tolist(), probs.tolist()):
+            labels[i] = label_map.get(id2label[label_id], "unknown")
+            scores[i] = score
+        done += len(batch)
+        if progress_callback is not None:
+            progress_callback(done, len(texts))
+    return labels, scores
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "youtube_comment_analysis", "sentiment.sqlite3"
+)
+
+
+# 🌟 Only Unicode normalization: anything more (case, whitespace) can change
+# what the model returns, and a cache hit must match a fresh prediction
+def normalize_text(text):
+    return unicodedata.normalize("NFC", str(text))
+
+
+def cache_key(model_id, revision, text):
+    raw = f"{model_id}\0{revision}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+# 🌟 Persistent (label, score) cache shared by every session and process on the
+# host. Entries are evicted least-recently-used once max_entries is exceeded.
+class SentimentCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=1_000_000):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, label TEXT, score REAL, last_used REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO counters VALUES (?, 0)", [("hits",), ("misses",)]
+            )
+
+    # Returns {key: (label, score)} for the keys found in the cache
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._conn.execute(
+                    "SELECT key, label, score FROM results WHERE key IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    chunk,
+                ).fetchall()
+                found.update((key, (label, score)) for key, label, score in rows)
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE results SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+            hits, misses = len(found), len(keys) - len(found)
+            self._conn.executemany(
+                "UPDATE counters SET value = value + ? WHERE name = ?",
+                [(hits, "hits"), (misses, "misses")],
+            )
+        self.hits += hits
+        self.misses += misses
+        return found
+
+    # items: iterable of (key, label, score)
+    def put_many(self, items):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                [(key, label, score, now) for key, label, score in items],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    # In-process counters plus the lifetime totals persisted in the database
+    def stats(self):
+        with self._lock:
+            totals = dict(self._conn.execute("SELECT name, value FROM counters"))
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("UPDATE counters SET value = 0")
+        self.hits = self.misses = 0
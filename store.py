@@ -0,0 +1,218 @@
+import datetime
+import os
+import threading
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "COMMENT_STORE_PATH",
+    os.path.join(
+        os.path.expanduser("~"), ".cache", "youtube_comment_analysis", "comments"
+    ),
+)
+
+# 🌟 On-disk schema. Sentiment is dictionary-encoded (a pandas Categorical when
+# read back); video_id and fetch_date are hive partition directories.
+# parent_id is the top-level comment a reply belongs to (null for top-level
+# comments and uploads)
+SCHEMA = pa.schema(
+    [
+        ("comment_id", pa.string()),
+        ("comment", pa.string()),
+        ("clean_comment", pa.string()),
+        ("published_at", pa.string()),
+        ("like_count", pa.int64()),
+        ("author_channel_id", pa.string()),
+        ("parent_id", pa.string()),
+        ("reply_count", pa.int64()),
+        ("sentiment", pa.dictionary(pa.int8(), pa.string())),
+        ("score", pa.float32()),
+        ("source", pa.string()),
+        ("video_id", pa.string()),
+        ("fetch_date", pa.string()),
+    ]
+)
+PARTITIONING = ds.partitioning(
+    pa.schema([("video_id", pa.string()), ("fetch_date", pa.string())]),
+    flavor="hive",
+)
+
+
+# 🌟 Cast columns to their SCHEMA types. Uploaded CSVs can hold anything:
+# numeric ids or comments become strings, and counts/scores that aren't
+# numbers (e.g. "1k") become nulls instead of failing the write.
+def _coerce(df):
+    for field in SCHEMA:
+        column = df[field.name]
+        if pa.types.is_dictionary(field.type):
+            df[field.name] = column.astype("string").astype("category")
+        elif pa.types.is_string(field.type):
+            df[field.name] = column.astype("string")
+        elif pa.types.is_integer(field.type):
+            numbers = pd.to_numeric(column, errors="coerce")
+            df[field.name] = numbers.where(numbers % 1 == 0).astype("Int64")
+        else:
+            df[field.name] = pd.to_numeric(column, errors="coerce").astype("float32")
+    return df
+
+
+# 🌟 One row per stored comment: of the rows sharing a (video_id, comment_id),
+# the one with the latest fetch_date. Rows without a comment_id (stored
+# before uploads got row ids) are all kept.
+def _latest_rows(df):
+    df = df.sort_values("fetch_date", kind="stable", ignore_index=True)
+    stale = df.duplicated(["video_id", "comment_id"], keep="last")
+    return df[~stale | df["comment_id"].isna()].reset_index(drop=True)
+
+
+# 🌟 Columnar comment store: Parquet files partitioned by video id and fetch
+# date, e.g. <root>/video_id=abc/fetch_date=2025-07-24/part-....parquet
+# Writes only ever add files, so re-analyzing a video or re-uploading a CSV
+# stores its comments again; read() keeps one row per (video_id, comment_id),
+# the one fetched last. Deduplicating on read rather than overwriting the
+# (video_id, fetch_date) partition keeps appends cheap and safe for callers
+# that write one partition in several chunks or runs (CommentStoreWriter,
+# incremental fetches on the same day).
+class CommentStore:
+    def __init__(self, root=DEFAULT_STORE_PATH):
+        self.root = root
+
+    # Append a DataFrame of comments. Missing columns are stored as nulls;
+    # rows without a video_id go under `video_id` (e.g. "upload-<name>").
+    # Rows without a comment_id (uploads) get "row-<n>", n being the row's
+    # position in the upload (`first_row` for the first row of `df`), so
+    # uploading the same file again replaces its rows instead of adding more.
+    def write(self, df, video_id=None, source=None, fetch_date=None, first_row=0):
+        if df.empty:
+            return
+        df = df.copy()
+        if "video_id" not in df.columns:
+            df["video_id"] = video_id
+        elif video_id is not None:
+            df["video_id"] = df["video_id"].fillna(video_id)
+        if "comment_id" not in df.columns:
+            df["comment_id"] = None
+        df["comment_id"] = df["comment_id"].astype(object)
+        missing = df["comment_id"].isna().to_numpy()
+        df.loc[missing, "comment_id"] = [
+            f"row-{first_row + i}" for i in missing.nonzero()[0]
+        ]
+        df["fetch_date"] = fetch_date or datetime.date.today().isoformat()
+        if source is not None:
+            df["source"] = source
+        for field in SCHEMA:
+            if field.name not in df.columns:
+                df[field.name] = None
+        df = _coerce(df)
+
+        table = pa.Table.from_pandas(
+            df[SCHEMA.names], schema=SCHEMA, preserve_index=False
+        )
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        )
+
+    def dataset(self):
+        return ds.dataset(
+            self.root, format="parquet", schema=SCHEMA, partitioning=PARTITIONING
+        )
+
+    # 🌟 Read with predicate pushdown: partition filters skip whole directories
+    # and the other filters are checked against Parquet row-group statistics
+    def read(
+        self,
+        video_id=None,
+        since=None,
+        until=None,
+        sentiment=None,
+        columns=None,
+        filter=None,
+    ):
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or SCHEMA.names)
+        expression = filter
+        conditions = []
+        if video_id is not None:
+            video_ids = [video_id] if isinstance(video_id, str) else list(video_id)
+            conditions.append(ds.field("video_id").isin(video_ids))
+        if since is not None:
+            conditions.append(ds.field("fetch_date") >= str(since))
+        if until is not None:
+            conditions.append(ds.field("fetch_date") <= str(until))
+        if sentiment is not None:
+            conditions.append(ds.field("sentiment") == sentiment)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        keys = ["video_id", "comment_id", "fetch_date"]
+        read_columns = columns and list(dict.fromkeys(columns + keys))
+        df = self.dataset().to_table(columns=read_columns, filter=expression)
+        df = _latest_rows(df.to_pandas())
+        return df if columns is None else df[columns]
+
+    def sentiment_counts(self, **filters):
+        df = self.read(columns=["sentiment"], **filters)
+        return df["sentiment"].value_counts()
+
+
+# 🌟 Buffers rows and writes them in large chunks, so streaming callers (one
+# API page at a time) don't litter the store with tiny Parquet files. With
+# ignore_errors=True a failed write drops that chunk and is kept in `error`
+# instead of raising, so saving a copy never fails the analysis itself.
+class CommentStoreWriter:
+    def __init__(
+        self, store, video_id=None, source=None, flush_rows=10_000, ignore_errors=False
+    ):
+        self.store = store
+        self.video_id = video_id
+        self.source = source
+        self.flush_rows = flush_rows
+        self.ignore_errors = ignore_errors
+        self.error = None
+        self._frames = []
+        self._rows = 0
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def append(self, df):
+        with self._lock:
+            self._frames.append(df)
+            self._rows += len(df)
+            if self._rows >= self.flush_rows:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        frames, self._frames, self._rows = self._frames, [], 0
+        if not frames:
+            return
+        df = pd.concat(frames, ignore_index=True)
+        first_row, self._written = self._written, self._written + len(df)
+        try:
+            self.store.write(
+                df,
+                video_id=self.video_id,
+                source=self.source,
+                first_row=first_row,
+            )
+        except Exception as exc:
+            if not self.ignore_errors:
+                raise
+            self.error = self.error or exc
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
@@ -0,0 +1,93 @@
+import contextvars
+import queue
+import threading
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+# Blocks while the queue is full (backpressure) but gives up once the
+# pipeline is stopped, so no thread stays stuck after the consumer leaves
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _run_source(source, outbox, stop):
+    try:
+        for item in source:
+            if not _put(outbox, item, stop):
+                return
+    except Exception as exc:
+        _put(outbox, _Failure(exc), stop)
+        return
+    finally:
+        if hasattr(source, "close"):
+            source.close()
+    _put(outbox, _END, stop)
+
+
+def _run_stage(fn, inbox, outbox, stop):
+    while not stop.is_set():
+        try:
+            item = inbox.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _END or isinstance(item, _Failure):
+            _put(outbox, item, stop)
+            return
+        try:
+            result = fn(item)
+        except Exception as exc:
+            _put(outbox, _Failure(exc), stop)
+            return
+        if not _put(outbox, result, stop):
+            return
+
+
+# 🌟 Producer/consumer pipeline: the source (e.g. API pages) and every stage
+# (cleaning, classification, ...) run on their own thread, connected by
+# bounded queues. Results are yielded in order as soon as they leave the last
+# stage; a slow consumer stalls the stages instead of piling up pages in
+# memory. Exceptions from any stage are re-raised here, and closing the
+# generator stops all threads. The threads run in copies of the caller's
+# context (so e.g. metrics.collect() sees their timings).
+def run_pipeline(source, stages, queue_size=2):
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    threads = [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run_source, iter(source), queues[0], stop),
+            daemon=True,
+        )
+    ]
+    threads += [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run_stage, fn, queues[i], queues[i + 1], stop),
+            daemon=True,
+        )
+        for i, fn in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
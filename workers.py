@@ -0,0 +1,87 @@
+import collections
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+
+from sentiment import DEFAULT_BACKEND, load_model, predict_sentiment_batch
+
+CHUNK_SIZE = 512
+
+
+# 🌟 Each worker loads the model once and gets an equal share of the cores,
+# so N workers x intra-op threads never oversubscribes the machine
+def _init_worker(backend, num_threads):
+    torch.set_num_threads(num_threads)
+    load_model(backend)
+
+
+def _classify_chunk(texts, batch_size, token_budget, backend):
+    return predict_sentiment_batch(
+        texts,
+        batch_size=batch_size,
+        token_budget=token_budget,
+        use_cache=False,
+        backend=backend,
+    )
+
+
+# 🌟 One long-lived pool per (workers, backend) so models stay loaded between jobs
+@functools.lru_cache(maxsize=None)
+def get_pool(workers, backend):
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        # spawn, not fork: forking a process that already started torch
+        # threads can deadlock the children
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(backend, num_threads),
+    )
+
+
+# 🌟 Shard texts into chunks across the pool and yield (labels, scores) per
+# chunk in input order. At most 2 chunks per worker are in flight, which keeps
+# every worker busy without pickling the whole input up front.
+def iter_predictions_in_pool(
+    texts,
+    workers,
+    batch_size=32,
+    token_budget=None,
+    backend=None,
+    chunk_size=CHUNK_SIZE,
+):
+    backend = backend or DEFAULT_BACKEND
+    pool = get_pool(workers, backend)
+    pending = collections.deque()
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start : start + chunk_size]
+        pending.append(
+            pool.submit(_classify_chunk, chunk, batch_size, token_budget, backend)
+        )
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def predict_in_pool(
+    texts,
+    workers,
+    batch_size=32,
+    token_budget=None,
+    progress_callback=None,
+    backend=None,
+    chunk_size=CHUNK_SIZE,
+):
+    labels, scores = [], []
+    for chunk_labels, chunk_scores in iter_predictions_in_pool(
+        texts, workers, batch_size, token_budget, backend, chunk_size
+    ):
+        labels.extend(chunk_labels)
+        scores.extend(chunk_scores)
+        if progress_callback is not None:
+            progress_callback(len(labels), len(texts))
+    return labels, scores
@@ -0,0 +1,400 @@
+import collections
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import metrics
+
+PAGE_SIZE = 100  # maximum maxResults allowed by commentThreads.list
+REPLY_PAGE_SIZE = 100  # maximum maxResults allowed by comments.list
+# Threads whose replies are fetched at the same time (capped by the 8 fetch
+# threads below)
+REPLY_CONCURRENCY = 4
+
+# 🌟 Point the client at a local stub of the API (e.g. http://127.0.0.1:8080)
+API_ENDPOINT = os.environ.get("YOUTUBE_API_ENDPOINT")
+DEFAULT_API_ENDPOINT = "https://youtube.googleapis.com"
+
+# 🌟 Partial response: only the fields parse_comment_records reads. Drops the
+# duplicated textOriginal, author names/avatars, etags, pageInfo, ... which
+# make up most of a full commentThreads.list page. googleapiclient already
+# asks for gzip ("accept-encoding: gzip" plus "(gzip)" in the user agent, which
+# Google APIs require before compressing) and httplib2 inflates the body.
+_SNIPPET_FIELDS = "snippet(textDisplay,authorChannelId,publishedAt,likeCount)"
+COMMENT_FIELDS = (
+    f"nextPageToken,items(snippet(topLevelComment(id,{_SNIPPET_FIELDS}),"
+    "totalReplyCount))"
+)
+# With part=snippet,replies: the same plus the (at most 5) inlined replies
+THREAD_FIELDS = (
+    f"nextPageToken,items(snippet(topLevelComment(id,{_SNIPPET_FIELDS}),"
+    f"totalReplyCount),replies(comments(id,{_SNIPPET_FIELDS})))"
+)
+REPLY_FIELDS = f"nextPageToken,items(id,{_SNIPPET_FIELDS})"
+
+# 🌟 Long-lived threads that run every page request. Each keeps its own
+# keep-alive connection (see _thread_http), so consecutive requests skip the
+# TCP/TLS handshake. Requests run in a copy of the submitter's context, so
+# their timings count toward the caller's metrics.collect() run.
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="youtube")
+_thread_local = threading.local()
+
+
+# 🌟 Initialize YouTube API client. Built once per (key, endpoint) and reused:
+# building parses the discovery document, which is measurable per click.
+@functools.lru_cache(maxsize=16)
+def build_client(api_key, api_endpoint=API_ENDPOINT):
+    from googleapiclient.discovery import build
+
+    client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+    return build(
+        "youtube",
+        "v3",
+        developerKey=api_key,
+        client_options=client_options,
+        static_discovery=True,
+    )
+
+
+# httplib2.Http is not thread-safe, so the shared client executes requests on
+# a per-thread connection instead of its own
+def _thread_http():
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        import httplib2
+
+        http = _thread_local.http = httplib2.Http(timeout=60)
+    return http
+
+
+# 🌟 API units spent, per method. Every list call costs 1 unit whatever its
+# `part`, whether or not it succeeds. Shared across threads.
+class QuotaCounter:
+    def __init__(self):
+        self.calls = collections.Counter()
+        self._lock = threading.Lock()
+
+    def charge(self, method, units=1):
+        with self._lock:
+            self.calls[method] += units
+
+    # Nothing to wait for; the quotaExceeded error is raised to the caller
+    def exhausted(self):
+        return False
+
+    @property
+    def units(self):
+        return sum(self.calls.values())
+
+
+# 🌟 Top-level comment texts from one commentThreads.list response
+def parse_comments(response):
+    return [
+        item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
+        for item in response.get("items", [])
+    ]
+
+
+def _comment_record(comment, parent_id=None, reply_count=0):
+    snippet = comment["snippet"]
+    return {
+        "comment_id": comment["id"],
+        "text": snippet["textDisplay"],
+        "published_at": snippet.get("publishedAt"),
+        "like_count": snippet.get("likeCount", 0),
+        "author_channel_id": snippet.get("authorChannelId", {}).get("value"),
+        "parent_id": parent_id,
+        "reply_count": reply_count,
+    }
+
+
+# 🌟 One record per top-level comment, for callers that need more than the text
+def parse_comment_records(response):
+    return [
+        _comment_record(
+            item["snippet"]["topLevelComment"],
+            reply_count=item["snippet"].get("totalReplyCount", 0),
+        )
+        for item in response.get("items", [])
+    ]
+
+
+# 🌟 Like parse_comment_records, but each record also has a "replies" list of
+# the replies inlined in the thread (part=snippet,replies)
+def parse_comment_threads(response):
+    records = parse_comment_records(response)
+    for record, item in zip(records, response.get("items", [])):
+        record["replies"] = [
+            _comment_record(reply, parent_id=record["comment_id"])
+            for reply in item.get("replies", {}).get("comments", [])
+        ]
+    return records
+
+
+# 🌟 Reply records from one comments.list response
+def parse_reply_records(response, parent_id):
+    return [
+        _comment_record(comment, parent_id=parent_id)
+        for comment in response.get("items", [])
+    ]
+
+
+def _is_quota_exceeded(exc):
+    return exc.resp.status == 403 and b"quotaExceeded" in (exc.content or b"")
+
+
+# Charge the call to `quota` and run it. When the API reports the daily quota
+# as used up, a quota.QuotaScheduler waits for the reset (or raises) on the
+# next charge, and the call is retried instead of failing the crawl.
+def _execute(request, method, quota=None):
+    from googleapiclient.errors import HttpError
+
+    while True:
+        if quota is not None:
+            quota.charge(method)
+        try:
+            with metrics.timer(f"fetch.{method}"):
+                return request.execute(http=_thread_http())
+        except HttpError as exc:
+            if quota is None or not _is_quota_exceeded(exc) or not quota.exhausted():
+                raise
+
+
+def _fetch_page(
+    youtube,
+    video_id,
+    page_token,
+    page_size,
+    order=None,
+    fields=COMMENT_FIELDS,
+    part="snippet",
+    quota=None,
+):
+    params = {}
+    if order is not None:
+        params["order"] = order
+    if fields is not None:
+        params["fields"] = fields
+    request = youtube.commentThreads().list(
+        part=part,
+        videoId=video_id,
+        maxResults=page_size,
+        pageToken=page_token,
+        textFormat="plainText",
+        **params,
+    )
+    return _execute(request, "commentThreads.list", quota)
+
+
+# 🌟 Yield the raw commentThreads.list responses of a video, starting at
+# `page_token` (None = first page) and following nextPageToken until the
+# thread list ends or max_comments threads are fetched (None = no limit). The
+# next page is requested on a background thread as soon as its token is
+# known, so the HTTP round trip overlaps with whatever the caller does with
+# this page. `order` is passed through to the API ("time" or "relevance");
+# `fields` limits the response (None = full response). Each request is
+# charged to `quota` (a QuotaCounter or quota.QuotaScheduler).
+def iter_comment_responses(
+    youtube,
+    video_id,
+    max_comments=None,
+    page_size=PAGE_SIZE,
+    page_token=None,
+    order=None,
+    fields=COMMENT_FIELDS,
+    part="snippet",
+    quota=None,
+):
+    fetch = functools.partial(
+        _fetch_page,
+        youtube,
+        video_id,
+        order=order,
+        fields=fields,
+        part=part,
+        quota=quota,
+    )
+    fetched = 0
+    future = _fetch_executor.submit(
+        contextvars.copy_context().run,
+        fetch,
+        page_token,
+        _page_size(page_size, max_comments),
+    )
+    while future is not None:
+        response = future.result()
+        fetched += len(response.get("items", []))
+
+        future = None
+        next_page_token = response.get("nextPageToken")
+        if next_page_token and (max_comments is None or fetched < max_comments):
+            remaining = None if max_comments is None else max_comments - fetched
+            future = _fetch_executor.submit(
+                contextvars.copy_context().run,
+                fetch,
+                next_page_token,
+                _page_size(page_size, remaining),
+            )
+        yield response
+
+
+# 🌟 Yield one list of comments per API page (see iter_comment_responses);
+# `parse` turns each response into the yielded list, and `fields` should
+# cover what it reads.
+def iter_comment_pages(
+    youtube,
+    video_id,
+    max_comments=None,
+    page_size=PAGE_SIZE,
+    order=None,
+    parse=parse_comments,
+    **kwargs,
+):
+    fetched = 0
+    for response in iter_comment_responses(
+        youtube, video_id, max_comments, page_size, order=order, **kwargs
+    ):
+        comments = parse(response)
+        if max_comments is not None:
+            comments = comments[: max_comments - fetched]
+        fetched += len(comments)
+        yield comments
+
+
+# 🌟 Every reply of one thread, following nextPageToken
+def fetch_replies(youtube, parent_id, quota=None):
+    replies, page_token = [], None
+    while True:
+        request = youtube.comments().list(
+            part="snippet",
+            parentId=parent_id,
+            maxResults=REPLY_PAGE_SIZE,
+            pageToken=page_token,
+            textFormat="plainText",
+            fields=REPLY_FIELDS,
+        )
+        response = _execute(request, "comments.list", quota)
+        replies.extend(parse_reply_records(response, parent_id))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return replies
+
+
+# 🌟 Replies of many threads, at most `concurrency` threads in flight at once.
+# Yields (parent_id, replies) in the order of parent_ids.
+def iter_replies(youtube, parent_ids, concurrency=REPLY_CONCURRENCY, quota=None):
+    pending = collections.deque()
+    for parent_id in parent_ids:
+        if len(pending) >= concurrency:
+            done_id, future = pending.popleft()
+            yield done_id, future.result()
+        pending.append(
+            (
+                parent_id,
+                _fetch_executor.submit(
+                    contextvars.copy_context().run,
+                    fetch_replies,
+                    youtube,
+                    parent_id,
+                    quota,
+                ),
+            )
+        )
+    while pending:
+        done_id, future = pending.popleft()
+        yield done_id, future.result()
+
+
+# 🌟 Pages of comment records, like iter_comment_pages with
+# parse_comment_records. With replies=True each page also holds the replies of
+# its threads (parent_id = the top-level comment's id), right after their
+# parent. Up to 5 replies come inlined with the thread; threads with more are
+# fetched in full through comments.list, `reply_concurrency` at a time.
+# max_comments counts top-level comments only.
+def iter_comment_records(
+    youtube,
+    video_id,
+    max_comments=None,
+    replies=False,
+    reply_concurrency=REPLY_CONCURRENCY,
+    quota=None,
+    **kwargs,
+):
+    if not replies:
+        yield from iter_comment_pages(
+            youtube,
+            video_id,
+            max_comments,
+            parse=parse_comment_records,
+            quota=quota,
+            **kwargs,
+        )
+        return
+
+    pages = iter_comment_pages(
+        youtube,
+        video_id,
+        max_comments,
+        parse=parse_comment_threads,
+        fields=THREAD_FIELDS,
+        part="snippet,replies",
+        quota=quota,
+        **kwargs,
+    )
+    for threads in pages:
+        yield expand_replies(youtube, threads, reply_concurrency, quota)
+
+
+# 🌟 Flatten threads from parse_comment_threads into records, each top-level
+# comment followed by all its replies (fetching the ones not inlined)
+def expand_replies(youtube, threads, concurrency=REPLY_CONCURRENCY, quota=None):
+    incomplete = [
+        thread["comment_id"]
+        for thread in threads
+        if len(thread["replies"]) < thread["reply_count"]
+    ]
+    fetched = dict(iter_replies(youtube, incomplete, concurrency, quota))
+    records = []
+    for thread in threads:
+        inlined = thread.pop("replies")
+        records.append(thread)
+        records.extend(fetched.get(thread["comment_id"], inlined))
+    return records
+
+
+def _page_size(page_size, remaining):
+    if remaining is None:
+        return page_size
+    return max(1, min(page_size, remaining))
+
+
+# 🌟 Comment records as a DataFrame in the column layout of store.CommentStore
+def records_to_frame(records):
+    return pd.DataFrame(records).rename(columns={"text": "comment"})
+
+
+# 🌟 Fetch up to max_comments top-level comments for a video, plus all their
+# replies with replies=True (see iter_comment_records); with `store` (a
+# store.CommentStore) the fetched comments are also saved to it
+def youtube_scraper(
+    video_id,
+    api_key,
+    max_comments=20,
+    store=None,
+    replies=False,
+    reply_concurrency=REPLY_CONCURRENCY,
+    quota=None,
+):
+    youtube = build_client(api_key)
+    records = []
+    for page in iter_comment_records(
+        youtube, video_id, max_comments, replies, reply_concurrency, quota
+    ):
+        records.extend(page)
+    if store is not None:
+        store.write(records_to_frame(records), video_id=video_id, source="scraper")
+    return [record["text"] for record in records]
@@ -0,0 +1,263 @@
+"""Headless sentiment analysis of YouTube comments, without Streamlit.
+
+Run:
+    python ytsent.py analyze --video VIDEO_ID [--video ...] --out results.parquet
+    python ytsent.py analyze --csv comments.csv --out results.parquet
+    python ytsent.py crawl VIDEO_ID --out comments.csv
+`analyze` runs the app's fetch/clean/classify stages and streams the results
+to --out (.parquet or .csv) page by page or chunk by chunk. `crawl` is the
+resumable bulk download of bulk_crawl.py. The API key is read from
+YOUTUBE_API_KEY; API quota is charged as a background crawl (see quota.py).
+--metrics PATH writes the run's stage timings as JSON (Prometheus text for a
+.prom path) and prints a summary of them.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+from collections import Counter
+
+import metrics
+from sentiment import BACKENDS, DEFAULT_BACKEND, DEFAULT_WORKERS
+
+VIDEO_COLUMNS = [
+    "video_id",
+    "comment_id",
+    "comment",
+    "published_at",
+    "like_count",
+    "author_channel_id",
+    "parent_id",
+    "reply_count",
+    "sentiment",
+    "score",
+]
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def require_api_key():
+    api_key = os.environ.get("YOUTUBE_API_KEY")
+    if not api_key:
+        raise SystemExit("Set YOUTUBE_API_KEY to the YouTube Data API key")
+    return api_key
+
+
+# 🌟 Appends DataFrames to a .parquet (one row group per write) or .csv file.
+# Parquet needs one schema for the whole file: `schema` if given, otherwise
+# the first frame's with every column as string except score.
+class ResultWriter:
+    def __init__(self, path, schema=None):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._parquet = path.endswith(".parquet")
+        self._writer = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                if self.schema is None:
+                    self.schema = pa.schema(
+                        [
+                            (name, pa.float64() if name == "score" else pa.string())
+                            for name in df.columns
+                        ]
+                    )
+                self._writer = pq.ParquetWriter(
+                    self.path, self.schema, compression="zstd"
+                )
+            table = pa.Table.from_pandas(
+                df[self.schema.names], schema=self.schema, preserve_index=False
+            )
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def analyze_videos(args, writer, store_writer_for):
+    from quota import BACKGROUND, QuotaScheduler
+    from pipeline import iter_classified_pages
+    from youtube import build_client, iter_comment_records
+
+    youtube = build_client(require_api_key())
+    quota = QuotaScheduler(priority=BACKGROUND)
+    counts = Counter()
+    for video_id in args.video:
+        pages = iter_comment_records(
+            youtube,
+            video_id,
+            args.max_comments,
+            replies=args.replies,
+            quota=quota,
+        )
+        with store_writer_for(video_id, "cli") as store_writer:
+            for _, df in iter_classified_pages(
+                pages,
+                batch_size=args.batch_size,
+                token_budget=args.token_budget,
+                workers=args.workers,
+                backend=args.backend,
+            ):
+                df = df.assign(video_id=video_id)
+                writer.write(df)
+                store_writer.append(df)
+                counts.update(df["sentiment"])
+                log(f"{video_id}: {writer.rows} comments analyzed")
+    return counts
+
+
+def analyze_csv(args, writer, store_writer_for):
+    from pipeline import iter_classified_csv
+
+    counts = Counter()
+    upload_name = os.path.basename(args.csv)
+    with store_writer_for(f"upload-{upload_name}", "csv") as store_writer:
+        # Read as strings so every chunk has the same Parquet schema
+        for chunk in iter_classified_csv(
+            args.csv,
+            chunk_rows=args.chunk_rows,
+            dtype=str,
+            batch_size=args.batch_size,
+            token_budget=args.token_budget,
+            workers=args.workers,
+            backend=args.backend,
+        ):
+            writer.write(chunk)
+            store_writer.append(chunk)
+            counts.update(chunk["sentiment"])
+            log(f"{writer.rows} rows analyzed")
+    return counts
+
+
+# 🌟 Parquet schema for fetched comments: the comment store's column types,
+# with sentiment as a plain string
+def video_schema():
+    import pyarrow as pa
+    from store import SCHEMA
+
+    return pa.schema(
+        [
+            pa.field(name, pa.string()) if name == "sentiment" else SCHEMA.field(name)
+            for name in VIDEO_COLUMNS
+        ]
+    )
+
+
+# Writes nothing; stands in for CommentStoreWriter without --store
+class _NoStore:
+    def append(self, df):
+        pass
+
+
+def analyze(args):
+    def store_writer_for(video_id, source):
+        if not args.store:
+            return contextlib.nullcontext(_NoStore())
+        from store import CommentStore, CommentStoreWriter
+
+        return CommentStoreWriter(CommentStore(), video_id, source=source)
+
+    schema = video_schema() if args.video and args.out.endswith(".parquet") else None
+    writer = ResultWriter(args.out, schema)
+    try:
+        if args.video:
+            counts = analyze_videos(args, writer, store_writer_for)
+        else:
+            counts = analyze_csv(args, writer, store_writer_for)
+    finally:
+        writer.close()
+    summary = ", ".join(f"{label} {n}" for label, n in counts.most_common())
+    print(f"{writer.rows} rows written to {args.out} ({summary or 'no comments'})")
+
+
+def crawl(args):
+    from bulk_crawl import crawl_to_csv
+    from quota import BACKGROUND, QuotaScheduler
+
+    out = args.out or f"{args.video_id}.csv"
+    checkpoint = crawl_to_csv(
+        args.video_id,
+        out,
+        require_api_key(),
+        max_comments=args.max_comments,
+        replies=args.replies,
+        quota=QuotaScheduler(priority=BACKGROUND),
+        log=log,
+    )
+    status = "complete" if checkpoint["done"] else "stopped at --max-comments"
+    print(f"{checkpoint['rows']} comments in {out} ({status})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="ytsent", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze_parser = commands.add_parser(
+        "analyze", help="fetch or read comments, classify them, write the results"
+    )
+    source = analyze_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", action="append", help="video id (repeatable)")
+    source.add_argument("--csv", help="CSV with a 'comment' column")
+    analyze_parser.add_argument("--out", required=True, help=".parquet or .csv")
+    analyze_parser.add_argument("--max-comments", type=int, default=None)
+    analyze_parser.add_argument("--replies", action="store_true")
+    analyze_parser.add_argument("--chunk-rows", type=int, default=50_000)
+    analyze_parser.add_argument("--batch-size", type=int, default=32)
+    analyze_parser.add_argument("--token-budget", type=int, default=8192)
+    analyze_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    analyze_parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    analyze_parser.add_argument(
+        "--store", action="store_true", help="also save to the comment store"
+    )
+    analyze_parser.set_defaults(func=analyze)
+
+    crawl_parser = commands.add_parser(
+        "crawl", help="resumable download of a video's comments to CSV"
+    )
+    crawl_parser.add_argument("video_id")
+    crawl_parser.add_argument("--out", help="CSV path (default: <video_id>.csv)")
+    crawl_parser.add_argument("--max-comments", type=int, default=None)
+    crawl_parser.add_argument("--replies", action="store_true")
+    crawl_parser.set_defaults(func=crawl)
+
+    for command_parser in (analyze_parser, crawl_parser):
+        command_parser.add_argument(
+            "--metrics", help="write stage timings here (.json or .prom)"
+        )
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze" and not args.out.endswith((".parquet", ".csv")):
+        parser.error("--out must end in .parquet or .csv")
+    with metrics.collect() as run:
+        try:
+            args.func(args)
+        finally:
+            if args.metrics:
+                metrics.dump(args.metrics, run)
+                log_timings(run)
+
+
+def log_timings(run):
+    for row in run.breakdown():
+        log(
+            f"{row['stage']:<24} {row['calls']:>7} calls {row['total_s']:>9.3f}s "
+            f"{row['mean_ms']:>9.1f}ms mean {row['share']:>5.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()